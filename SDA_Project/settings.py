@@ -35,7 +35,7 @@ LOGOUT_REDIRECT_URL = 'home'
 # For production - Working Gmail SMTP configuration
 # Configure email backend:
 # - If explicit EMAIL_BACKEND is set in environment, use it
-# - Otherwise, if SMTP credentials are present, use SMTP backend
+# - Otherwise, if SMTP credentials are present, use SMTP backend (connections are pooled)
 # - Otherwise default to console backend for local development
 env_email_backend = os.getenv('EMAIL_BACKEND')
 env_email_user = os.getenv('EMAIL_HOST_USER')
@@ -43,12 +43,14 @@ env_email_pass = os.getenv('EMAIL_HOST_PASSWORD')
 if env_email_backend:
     EMAIL_BACKEND = env_email_backend
 elif env_email_user and env_email_pass:
-    EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+    EMAIL_BACKEND = 'sda_app.email_backend.PooledSMTPEmailBackend'
 else:
     EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.gmail.com')  # For Gmail
 EMAIL_PORT = int(os.getenv('EMAIL_PORT', 587))
 EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'True').lower() in ('1', 'true', 'yes')
+# Fail a stalled SMTP connection instead of blocking an email worker indefinitely
+EMAIL_TIMEOUT = int(os.getenv('EMAIL_TIMEOUT', 30))
 # Read email credentials from environment (no fallback for security)
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
@@ -101,7 +103,7 @@ ROOT_URLCONF = 'SDA_Project.urls'
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [],
+        'DIRS': [BASE_DIR / 'templates'],  # Email templates only
         'APP_DIRS': False,  # Disabled - using React frontend
         'OPTIONS': {
             'context_processors': [
@@ -184,6 +186,12 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # JSON only: the browsable API needs app templates, which are disabled (React frontend).
+    # DRF's JSONRenderer stays listed as the fallback for the same media type
+    'DEFAULT_RENDERER_CLASSES': [
+        'sda_app.renderers.ORJSONRenderer',
+        'rest_framework.renderers.JSONRenderer',
+    ],
 }
 
 # CSRF Configuration for React
@@ -195,6 +203,56 @@ CSRF_COOKIE_HTTPONLY = False
 CSRF_COOKIE_SAMESITE = 'Lax'
 SESSION_COOKIE_SAMESITE = 'Lax'
 
+# Cache Configuration
+# Use Redis when REDIS_URL is set so counters are shared across workers,
+# otherwise fall back to per-process local memory for local development.
+# Production needs REDIS_URL: with local memory every worker keeps its own
+# OTP attempt counters and budget alert markers, so limits and dedup only
+# hold per process.
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Whether all workers see the same cache; values that are adjusted in place
+# (running category totals) are only kept in the cache when they do
+CACHE_IS_SHARED = bool(REDIS_URL)
+
+# Logging Configuration
+# App logs are queued and written by a background thread so slow stdout/stderr
+# pipes never stall request threads; DEBUG messages are skipped unless LOG_LEVEL=DEBUG
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'standard': {
+            'format': '%(asctime)s %(levelname)s %(name)s: %(message)s',
+        },
+    },
+    'handlers': {
+        'background_console': {
+            'class': 'sda_app.log_handlers.BackgroundStreamHandler',
+            'formatter': 'standard',
+        },
+    },
+    'loggers': {
+        'sda_app': {
+            'handlers': ['background_console'],
+            'level': os.getenv('LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -3,44 +3,107 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.contrib.auth import authenticate, login, logout
+from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import ensure_csrf_cookie
-from .models import User, Account, OtherExpenses
-from .serializers import UserSerializer, AccountSerializer, ExpenseSerializer
+from django.views.decorators.http import condition, require_POST
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum, Avg, Count, Max, StdDev
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from .models import User, Account, OtherExpenses, OTPVerification, Notification, CategoryBudget
+from .serializers import UserSerializer, AccountSerializer, ExpenseSerializer, CategoryBudgetSerializer
 from .email_service import OTPService
-from .chatbot_service import FinancialChatbotService
+from .chatbot_service import get_chatbot_service
 from .financial_analyzer import FinancialAnalyzer
-import random
+from .signals import get_category_total
+from .renderers import dumps as dump_json
+import json
+import logging
+import time
+from decimal import Decimal
 from datetime import datetime, timedelta
 
+logger = logging.getLogger(__name__)
+
+def _normalize_email(email):
+    """Lowercase an email so lookups match the normalized stored value"""
+    return email.lower() if email else email
+
+# OTP brute-force protection (per email + purpose)
+OTP_MAX_ATTEMPTS = 10
+OTP_ATTEMPT_WINDOW = 300  # seconds
+
+
+def _otp_attempts_exceeded(email, purpose):
+    """Count a verification attempt and check if the limit has been exceeded"""
+    key = f"otp:{email}:{purpose}"
+    if cache.add(key, 1, OTP_ATTEMPT_WINDOW):
+        return False
+    try:
+        attempts = cache.incr(key)
+    except ValueError:
+        # Key expired between add() and incr()
+        cache.set(key, 1, OTP_ATTEMPT_WINDOW)
+        attempts = 1
+    return attempts > OTP_MAX_ATTEMPTS
+
+
+def _reset_otp_attempts(email, purpose):
+    """Clear the attempt counter after a successful verification"""
+    cache.delete(f"otp:{email}:{purpose}")
+
+
+def _too_many_attempts_response():
+    return Response({'error': 'Too many attempts. Please try again later.'}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+def _issue_otp(email, purpose):
+    """Generate a new OTP code, deleting any pending ones for the same email and purpose"""
+    return OTPVerification.create_otp(email, purpose).otp_code
+
+# Cached financial insights (invalidated by bumping a per-user version)
+INSIGHTS_CACHE_TIMEOUT = 3600  # seconds
+
+
+def _insights_version(user_id):
+    return cache.get(f"insights_ver:{user_id}", 0)
+
+
+def _invalidate_insights(user_id):
+    """Bump the user's insights version so the next request recomputes them"""
+    cache.set(f"insights_ver:{user_id}", time.time_ns(), None)
+
 # Auth APIs
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def signup_api(request):
     """User registration with OTP"""
     try:
-        email = request.data.get('email')
+        email = _normalize_email(request.data.get('email'))
         username = request.data.get('username')
         
-        if User.objects.filter(email=email).exists():
-            return Response({'error': 'Email already exists'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        if User.objects.filter(username=username).exists():
-            return Response({'error': 'Username already exists'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Create user (inactive until OTP verified)
-        user = User.objects.create_user(
-            email=email,
-            username=username,
-            first_name=request.data.get('first_name'),
-            last_name=request.data.get('last_name'),
-            password=request.data.get('password'),
-            is_active=False
-        )
+        # Create user (inactive until OTP verified); email and username are unique in the
+        # database, so duplicates are caught on insert instead of pre-checked with SELECTs
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(
+                    email=email,
+                    username=username,
+                    first_name=request.data.get('first_name'),
+                    last_name=request.data.get('last_name'),
+                    password=request.data.get('password'),
+                    is_active=False
+                )
+        except IntegrityError:
+            if User.objects.filter(email=email).exists():
+                return Response({'error': 'Email already exists'}, status=status.HTTP_400_BAD_REQUEST)
+            if User.objects.filter(username=username).exists():
+                return Response({'error': 'Username already exists'}, status=status.HTTP_400_BAD_REQUEST)
+            raise
         
         # Generate and send OTP
-        otp = str(random.randint(100000, 999999))
-        from .models import OTPVerification
-        OTPVerification.objects.create(email=email, otp_code=otp, purpose='signup')
+        otp = _issue_otp(email, 'signup')
         OTPService.send_otp_email(email, otp)
         
         return Response({'message': 'OTP sent to email'}, status=status.HTTP_201_CREATED)
@@ -52,30 +115,27 @@ def signup_api(request):
 def verify_otp_api(request):
     """Verify OTP and activate account"""
     try:
-        email = request.data.get('email')
+        email = _normalize_email(request.data.get('email'))
         otp = request.data.get('otp')
         
-        from .models import OTPVerification
-        otp_record = OTPVerification.objects.filter(
-            email=email,
-            otp_code=otp,
-            purpose='signup',
-            is_verified=False
-        ).first()
-        
-        if not otp_record or not otp_record.is_valid():
-            return Response({'error': 'Invalid or expired OTP'}, status=status.HTTP_400_BAD_REQUEST)
+        if _otp_attempts_exceeded(email, 'signup'):
+            return _too_many_attempts_response()
         
-        # Activate user
-        user = User.objects.get(email=email)
-        user.is_active = True
-        user.save()
-        
-        # Create account
-        Account.objects.create(user=user, current_balance=0, savings=0, monthly_income=0, total_expenses=0, budget_limit=0)
+        with transaction.atomic():
+            # The OTP is used up by the same UPDATE that checks it, so a replayed
+            # request can't verify twice; a failure below puts it back
+            if not OTPVerification.consume(email, 'signup', otp):
+                return Response({'error': 'Invalid or expired OTP'}, status=status.HTTP_400_BAD_REQUEST)
+            
+            # Activate user
+            user = User.objects.get(email=email)
+            user.is_active = True
+            user.save(update_fields=['is_active'])
+            
+            # Create account
+            Account.objects.create(user=user, current_balance=0, savings=0, monthly_income=0, total_expenses=0, budget_limit=0)
         
-        otp_record.is_verified = True
-        otp_record.save()
+        _reset_otp_attempts(email, 'signup')
         
         # Send Paisa Pro membership welcome email
         OTPService.send_membership_email(user.email, user.get_full_name())
@@ -90,7 +150,7 @@ def update_profile_api(request):
     """Update user profile with email change support (requires OTP if email changed)"""
     try:
         user = request.user
-        new_email = request.data.get('email')
+        new_email = _normalize_email(request.data.get('email'))
         
         # Update name fields
         user.first_name = request.data.get('first_name', user.first_name)
@@ -103,9 +163,7 @@ def update_profile_api(request):
                 return Response({'error': 'Email already in use'}, status=status.HTTP_400_BAD_REQUEST)
             
             # Generate and send OTP for email verification
-            otp = str(random.randint(100000, 999999))
-            from .models import OTPVerification
-            OTPVerification.objects.create(email=new_email, otp_code=otp, purpose='email_change')
+            otp = _issue_otp(new_email, 'email_change')
             OTPService.send_otp_email(new_email, otp)
             
             # Store pending email change in session
@@ -114,13 +172,13 @@ def update_profile_api(request):
                 'user_id': user.id
             }
             
-            user.save()
+            user.save(update_fields=['first_name', 'last_name'])
             return Response({
                 'message': 'OTP sent to new email for verification',
                 'requires_otp': True
             }, status=status.HTTP_200_OK)
         
-        user.save()
+        user.save(update_fields=['first_name', 'last_name'])
         return Response({
             'message': 'Profile updated successfully',
             'user': UserSerializer(user).data
@@ -139,24 +197,19 @@ def verify_email_change_api(request):
         if not pending_change:
             return Response({'error': 'No pending email change'}, status=status.HTTP_400_BAD_REQUEST)
         
-        from .models import OTPVerification
-        otp_record = OTPVerification.objects.filter(
-            email=pending_change['new_email'],
-            otp_code=otp,
-            purpose='email_change',
-            is_verified=False
-        ).first()
+        if _otp_attempts_exceeded(pending_change['new_email'], 'email_change'):
+            return _too_many_attempts_response()
         
-        if not otp_record or not otp_record.is_valid():
-            return Response({'error': 'Invalid or expired OTP'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Update email
-        user = User.objects.get(id=pending_change['user_id'])
-        user.email = pending_change['new_email']
-        user.save()
+        with transaction.atomic():
+            if not OTPVerification.consume(pending_change['new_email'], 'email_change', otp):
+                return Response({'error': 'Invalid or expired OTP'}, status=status.HTTP_400_BAD_REQUEST)
+            
+            # Update email
+            user = User.objects.get(id=pending_change['user_id'])
+            user.email = pending_change['new_email']
+            user.save(update_fields=['email'])
         
-        otp_record.is_verified = True
-        otp_record.save()
+        _reset_otp_attempts(pending_change['new_email'], 'email_change')
         
         # Clear session
         del request.session['pending_email_change']
@@ -176,20 +229,13 @@ def login_api(request):
         email_or_username = request.data.get('email')  # Can be email or username
         password = request.data.get('password')
         
-        # Try to find user by email or username
-        user_obj = None
+        # Try to find user by email or username (only the email is needed to authenticate)
         if '@' in email_or_username:
             # Looks like an email
-            try:
-                user_obj = User.objects.get(email=email_or_username)
-            except User.DoesNotExist:
-                pass
+            user_obj = User.objects.filter(email=_normalize_email(email_or_username)).only('id', 'email').first()
         else:
             # Looks like a username
-            try:
-                user_obj = User.objects.get(username=email_or_username)
-            except User.DoesNotExist:
-                pass
+            user_obj = User.objects.filter(username=email_or_username).only('id', 'email').first()
         
         # Authenticate using email (USERNAME_FIELD)
         if user_obj:
@@ -202,7 +248,7 @@ def login_api(request):
             # Mark that user has logged in at least once
             if user.is_first_login:
                 user.is_first_login = False
-                user.save()
+                user.save(update_fields=['is_first_login'])
             return Response({
                 'message': 'Login successful',
                 'user': UserSerializer(user).data
@@ -242,7 +288,7 @@ def delete_account_api(request):
             'message': 'Account and all associated data deleted successfully'
         }, status=status.HTTP_200_OK)
     except Exception as e:
-        print(f"Delete account error: {str(e)}")
+        logger.exception("Delete account failed")
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['GET'])
@@ -258,15 +304,12 @@ def current_user_api(request):
 def forgot_password_api(request):
     """Send password reset OTP"""
     try:
-        email = request.data.get('email')
-        user = User.objects.filter(email=email).first()
+        email = _normalize_email(request.data.get('email'))
         
-        if not user:
+        if not User.objects.filter(email=email).exists():
             return Response({'error': 'Email not found'}, status=status.HTTP_404_NOT_FOUND)
         
-        otp = str(random.randint(100000, 999999))
-        from .models import OTPVerification
-        OTPVerification.objects.create(email=email, otp_code=otp, purpose='password_reset')
+        otp = _issue_otp(email, 'password_reset')
         OTPService.send_otp_email(email, otp)
         
         return Response({'message': 'Reset code sent to email'}, status=status.HTTP_200_OK)
@@ -278,20 +321,26 @@ def forgot_password_api(request):
 def verify_password_reset_otp_api(request):
     """Verify password reset OTP"""
     try:
-        email = request.data.get('email')
+        email = _normalize_email(request.data.get('email'))
         otp = request.data.get('otp')
         
-        from .models import OTPVerification
-        otp_record = OTPVerification.objects.filter(
+        if _otp_attempts_exceeded(email, 'password_reset'):
+            return _too_many_attempts_response()
+        
+        # Only checked here; the code is used up when the new password is set
+        otp_valid = OTPVerification.objects.filter(
             email=email,
             otp_code=otp,
             purpose='password_reset',
-            is_verified=False
-        ).first()
+            is_verified=False,
+            expires_at__gte=timezone.now()
+        ).exists()
         
-        if not otp_record or not otp_record.is_valid():
+        if not otp_valid:
             return Response({'error': 'Invalid or expired OTP'}, status=status.HTTP_400_BAD_REQUEST)
         
+        _reset_otp_attempts(email, 'password_reset')
+        
         return Response({'message': 'OTP verified'}, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -301,27 +350,22 @@ def verify_password_reset_otp_api(request):
 def set_new_password_api(request):
     """Set new password after OTP verification"""
     try:
-        email = request.data.get('email')
+        email = _normalize_email(request.data.get('email'))
         otp = request.data.get('otp')
         new_password = request.data.get('new_password')
         
-        from .models import OTPVerification
-        otp_record = OTPVerification.objects.filter(
-            email=email,
-            otp_code=otp,
-            purpose='password_reset',
-            is_verified=False
-        ).first()
-        
-        if not otp_record or not otp_record.is_valid():
-            return Response({'error': 'Invalid or expired OTP'}, status=status.HTTP_400_BAD_REQUEST)
+        if _otp_attempts_exceeded(email, 'password_reset'):
+            return _too_many_attempts_response()
         
-        user = User.objects.get(email=email)
-        user.set_password(new_password)
-        user.save()
+        with transaction.atomic():
+            if not OTPVerification.consume(email, 'password_reset', otp):
+                return Response({'error': 'Invalid or expired OTP'}, status=status.HTTP_400_BAD_REQUEST)
+            
+            user = User.objects.get(email=email)
+            user.set_password(new_password)
+            user.save(update_fields=['password'])
         
-        otp_record.is_verified = True
-        otp_record.save()
+        _reset_otp_attempts(email, 'password_reset')
         
         return Response({'message': 'Password reset successful'}, status=status.HTTP_200_OK)
     except Exception as e:
@@ -332,11 +376,8 @@ def set_new_password_api(request):
 def resend_otp_api(request):
     """Resend OTP"""
     try:
-        email = request.data.get('email')
-        otp = str(random.randint(100000, 999999))
-        
-        from .models import OTPVerification
-        OTPVerification.objects.create(email=email, otp_code=otp, purpose='signup')
+        email = _normalize_email(request.data.get('email'))
+        otp = _issue_otp(email, 'signup')
         OTPService.send_otp_email(email, otp)
         
         return Response({'message': 'OTP resent successfully'}, status=status.HTTP_200_OK)
@@ -358,6 +399,7 @@ def account_api(request):
             serializer = AccountSerializer(account, data=request.data, partial=True)
             if serializer.is_valid():
                 serializer.save()
+                _invalidate_insights(request.user.id)
                 return Response(serializer.data, status=status.HTTP_200_OK)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
@@ -391,6 +433,18 @@ def dashboard_api(request):
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 # Expense APIs
+def _expenses_etag(request, *args, **kwargs):
+    """ETag for the expense list - changes whenever an expense is added or removed"""
+    if request.method != 'GET' or not request.user.is_authenticated:
+        return None
+    stats = OtherExpenses.objects.filter(user=request.user).aggregate(
+        count=Count('id'),
+        latest=Max('date_timestamp')
+    )
+    latest = stats['latest'].timestamp() if stats['latest'] else 0
+    return f"{request.user.id}-{stats['count']}-{latest}"
+
+@condition(etag_func=_expenses_etag)
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
 def expenses_api(request):
@@ -399,26 +453,31 @@ def expenses_api(request):
         user = request.user
         
         if request.method == 'GET':
-            expenses = OtherExpenses.objects.filter(user=user).order_by('-expense_date')
-            return Response(ExpenseSerializer(expenses, many=True).data, status=status.HTTP_200_OK)
+            # Project only the serialized columns as dicts instead of hydrating models
+            expenses = list(OtherExpenses.objects.filter(user=user).order_by('-expense_date').values(
+                'id', 'category', 'amount', 'expense_date', 'description', 'date_timestamp'
+            ))
+            for expense in expenses:
+                # Keep the same string representation as ExpenseSerializer
+                expense['amount'] = str(expense['amount'])
+            return Response(expenses, status=status.HTTP_200_OK)
         
         elif request.method == 'POST':
             data = request.data.copy()
             # Remove user from data if present (will be set by save)
             data.pop('user', None)
             
-            # Debug: Print received data
-            print(f"DEBUG: Received expense data: {data}")
-            print(f"DEBUG: Amount received: {data.get('amount')}, Type: {type(data.get('amount'))}")
+            logger.debug("Received expense data: %s", data)
             
             serializer = ExpenseSerializer(data=data)
             if serializer.is_valid():
                 expense = serializer.save(user=user)
-                print(f"DEBUG: Expense created with amount: {expense.amount}")
+                logger.debug("Expense %s created with amount %s", expense.id, expense.amount)
                 # Deduct from account balance and update totals
                 account = user.account
                 account.subtract_expense(expense.amount)
                 account.update_total_expenses()
+                _invalidate_insights(user.id)
                 
                 # Reload account to get updated totals
                 account.refresh_from_db()
@@ -429,8 +488,8 @@ def expenses_api(request):
                 # Check for budget overspending
                 try:
                     check_budget_overspending(user, expense)
-                except Exception as check_error:
-                    print(f"Error in check_budget_overspending: {check_error}")
+                except Exception:
+                    logger.exception("Budget overspending check failed for user %s", user.id)
                 
                 return Response(ExpenseSerializer(expense).data, status=status.HTTP_201_CREATED)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -456,6 +515,7 @@ def expense_detail_api(request, expense_id):
             account = user.account
             account.add_money(expense_amount)
             account.update_total_expenses()
+            _invalidate_insights(user.id)
             
             return Response({'message': 'Expense removed successfully', 'refunded_amount': expense_amount}, status=status.HTTP_200_OK)
         except OtherExpenses.DoesNotExist:
@@ -464,17 +524,21 @@ def expense_detail_api(request, expense_id):
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 # Chatbot API
-@api_view(['POST'])
-@permission_classes([IsAuthenticated])
-def chatbot_api(request):
+# Plain async Django view (DRF's api_view is sync-only) so a worker isn't held
+# while waiting on Gemini when served over ASGI. CSRF is enforced by the middleware.
+@require_POST
+async def chatbot_api(request):
     """Handle chatbot conversation"""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=status.HTTP_403_FORBIDDEN)
     try:
-        user_message = request.data.get('message')
-        chatbot = FinancialChatbotService()
-        response = chatbot.generate_response(user_message, request.user)
-        return Response({'response': response}, status=status.HTTP_200_OK)
+        user_message = json.loads(request.body or b'{}').get('message')
+        chatbot = get_chatbot_service()
+        response = await chatbot.generate_response(user_message, user)
+        return JsonResponse({'response': response}, status=status.HTTP_200_OK)
     except Exception as e:
-        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return JsonResponse({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 # Financial Insights API
 @api_view(['GET'])
@@ -482,6 +546,13 @@ def chatbot_api(request):
 def financial_insights_api(request):
     """Get data-driven financial insights based on user's actual spending"""
     try:
+        user_id = request.user.id
+        # Month is part of the key since the analysis is based on the current month
+        cache_key = f"insights:{user_id}:{_insights_version(user_id)}:{datetime.now():%Y-%m}"
+        insights = cache.get(cache_key)
+        if insights is not None:
+            return Response(insights, status=status.HTTP_200_OK)
+        
         analyzer = FinancialAnalyzer(request.user)
         insights = analyzer.get_all_insights()
         
@@ -494,6 +565,7 @@ def financial_insights_api(request):
         insights['corrective_actions'] = corrective_actions
         insights['saving_tips'] = saving_tips
         
+        cache.set(cache_key, insights, INSIGHTS_CACHE_TIMEOUT)
         return Response(insights, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -508,7 +580,8 @@ def income_setup_api(request):
         
         if monthly_income is not None:
             account.monthly_income = monthly_income
-            account.save()
+            account.save(update_fields=['monthly_income'])
+            _invalidate_insights(request.user.id)
             return Response({'message': 'Monthly income updated', 'account': AccountSerializer(account).data}, status=status.HTTP_200_OK)
         return Response({'error': 'Monthly income is required'}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
@@ -519,15 +592,17 @@ def income_setup_api(request):
 def add_money_api(request):
     """Add money to current balance"""
     try:
-        from decimal import Decimal
-        account = request.user.account
         amount = request.data.get('amount')
         money_type = request.data.get('money_type', 'salary')
         
         if amount and float(amount) > 0:
             amount_decimal = Decimal(str(amount))
-            account.current_balance += amount_decimal
-            account.save()
+            # Single atomic UPDATE instead of read-modify-save
+            Account.objects.filter(user_id=request.user.id).update(
+                current_balance=F('current_balance') + amount_decimal
+            )
+            _invalidate_insights(request.user.id)
+            account = Account.objects.get(user_id=request.user.id)
             return Response({'message': 'Money added successfully', 'account': AccountSerializer(account).data}, status=status.HTTP_200_OK)
         return Response({'error': 'Please enter a valid positive amount'}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
@@ -538,11 +613,21 @@ def add_money_api(request):
 def add_savings_api(request):
     """Add money to savings"""
     try:
-        account = request.user.account
         amount = request.data.get('amount')
         
         if amount and float(amount) > 0:
-            if account.add_to_savings(float(amount)):
+            amount_decimal = Decimal(str(amount))
+            # Balance check and transfer in one conditional UPDATE (no race between read and write)
+            updated = Account.objects.filter(
+                user_id=request.user.id,
+                current_balance__gte=amount_decimal
+            ).update(
+                current_balance=F('current_balance') - amount_decimal,
+                savings=F('savings') + amount_decimal
+            )
+            if updated:
+                _invalidate_insights(request.user.id)
+                account = Account.objects.get(user_id=request.user.id)
                 return Response({'message': 'Savings added successfully', 'account': AccountSerializer(account).data}, status=status.HTTP_200_OK)
             else:
                 return Response({'error': 'Insufficient balance'}, status=status.HTTP_400_BAD_REQUEST)
@@ -555,11 +640,21 @@ def add_savings_api(request):
 def withdraw_savings_api(request):
     """Withdraw money from savings"""
     try:
-        account = request.user.account
         amount = request.data.get('amount')
         
         if amount and float(amount) > 0:
-            if account.withdraw_from_savings(float(amount)):
+            amount_decimal = Decimal(str(amount))
+            # Savings check and transfer in one conditional UPDATE (no race between read and write)
+            updated = Account.objects.filter(
+                user_id=request.user.id,
+                savings__gte=amount_decimal
+            ).update(
+                savings=F('savings') - amount_decimal,
+                current_balance=F('current_balance') + amount_decimal
+            )
+            if updated:
+                _invalidate_insights(request.user.id)
+                account = Account.objects.get(user_id=request.user.id)
                 return Response({'message': 'Withdrawal successful', 'account': AccountSerializer(account).data}, status=status.HTTP_200_OK)
             else:
                 return Response({'error': 'Insufficient savings'}, status=status.HTTP_400_BAD_REQUEST)
@@ -572,13 +667,11 @@ def withdraw_savings_api(request):
 def budget_api(request):
     """Get or set budget limit and category budgets"""
     try:
-        from .serializers import CategoryBudgetSerializer
-        from .models import CategoryBudget
         account = request.user.account
         
         if request.method == 'GET':
-            # Get category budgets
-            category_budgets = CategoryBudget.objects.filter(user=request.user)
+            # Get category budgets (spent per category is annotated in the same query)
+            category_budgets = CategoryBudget.with_spent(request.user)
             category_data = CategoryBudgetSerializer(category_budgets, many=True).data
             
             # Calculate budget usage percentage
@@ -602,7 +695,7 @@ def budget_api(request):
             
             if budget_limit is not None:
                 account.budget_limit = budget_limit
-                account.save()
+                account.save(update_fields=['budget_limit'])
             
             # Update or create category budgets
             for cat_budget in category_budgets:
@@ -615,8 +708,10 @@ def budget_api(request):
                     defaults={'limit': cat_budget['limit']}
                 )
             
+            _invalidate_insights(request.user.id)
+            
             # Return updated data
-            category_budgets_updated = CategoryBudget.objects.filter(user=request.user)
+            category_budgets_updated = CategoryBudget.with_spent(request.user)
             category_data = CategoryBudgetSerializer(category_budgets_updated, many=True).data
             
             return Response({
@@ -632,11 +727,6 @@ def budget_api(request):
 def spending_report_api(request):
     """Get spending report with category breakdown and analytics"""
     try:
-        from django.db.models import Sum
-        from django.db.models.functions import TruncMonth
-        from datetime import datetime, timedelta
-        from decimal import Decimal
-        
         user = request.user
         
         # Get filters from request
@@ -760,33 +850,26 @@ def get_csrf_token(request):
 def get_notifications_api(request):
     """Get user notifications"""
     try:
-        from .models import Notification
         # Get all notifications for the user
-        all_notifications = Notification.objects.filter(user=request.user).order_by('-created_at')
+        all_notifications = Notification.objects.filter(user=request.user)
         
         # Get unread count before slicing
         unread_count = all_notifications.filter(is_read=False).count()
         
-        # Get latest 20 notifications
-        notifications = all_notifications[:20]
-        
-        data = [{
-            'id': n.id,
-            'title': n.title,
-            'message': n.message,
-            'type': n.notification_type,
-            'is_read': n.is_read,
-            'created_at': n.created_at.isoformat()
-        } for n in notifications]
+        # Get latest 20 notifications as plain dicts (no model instantiation)
+        data = list(all_notifications.order_by('-created_at').values(
+            'id', 'title', 'message', 'is_read', 'created_at',
+            type=F('notification_type')
+        )[:20])
         
-        return Response({
+        # Polled frequently by the frontend, so the payload skips DRF's response
+        # rendering but is encoded exactly like every other API response
+        return HttpResponse(dump_json({
             'notifications': data,
             'unread_count': unread_count
-        }, status=status.HTTP_200_OK)
+        }), content_type='application/json', status=status.HTTP_200_OK)
     except Exception as e:
-        print(f"DEBUG: Error in get_notifications_api: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Fetching notifications failed for user %s", request.user.id)
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['POST'])
@@ -794,12 +877,11 @@ def get_notifications_api(request):
 def mark_notification_read_api(request, notification_id):
     """Mark notification as read"""
     try:
-        from .models import Notification
-        notification = Notification.objects.get(id=notification_id, user=request.user)
-        notification.mark_as_read()
+        # Single UPDATE scoped to the user; no row matched means it doesn't exist or isn't theirs
+        updated = Notification.objects.filter(id=notification_id, user=request.user).update(is_read=True)
+        if not updated:
+            return Response({'error': 'Notification not found'}, status=status.HTTP_404_NOT_FOUND)
         return Response({'message': 'Notification marked as read'}, status=status.HTTP_200_OK)
-    except Notification.DoesNotExist:
-        return Response({'error': 'Notification not found'}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -808,7 +890,6 @@ def mark_notification_read_api(request, notification_id):
 def mark_all_notifications_read_api(request):
     """Mark all notifications as read"""
     try:
-        from .models import Notification
         Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
         return Response({'message': 'All notifications marked as read'}, status=status.HTTP_200_OK)
     except Exception as e:
@@ -819,36 +900,39 @@ def mark_all_notifications_read_api(request):
 def clear_all_notifications_api(request):
     """Clear all notifications"""
     try:
-        from .models import Notification
         Notification.objects.filter(user=request.user).delete()
         return Response({'message': 'All notifications cleared'}, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 # Unusual Spending Detection
+UNUSUAL_ZSCORE_THRESHOLD = 2.5
+
 def detect_unusual_expense(user, expense):
     """Detect if expense is unusual based on user's history"""
-    from .models import Notification
-    from decimal import Decimal
-    
-    # Get user's expense history for this category
-    similar_expenses = OtherExpenses.objects.filter(
+    # Stats over the user's last 30 expenses in this category, computed in the database
+    stats = OtherExpenses.objects.filter(
         user=user,
         category=expense.category
-    ).exclude(id=expense.id).order_by('-expense_date')[:30]
+    ).exclude(id=expense.id).order_by('-expense_date')[:30].aggregate(
+        avg=Avg('amount'),
+        std=StdDev('amount'),
+        count=Count('id')
+    )
     
-    if similar_expenses.count() < 3:
+    if stats['count'] < 3:
         # Not enough history to detect unusual spending
         return False
     
-    # Calculate average and standard deviation
-    amounts = [float(e.amount) for e in similar_expenses]
-    avg_amount = sum(amounts) / len(amounts)
+    avg_amount = float(stats['avg'])
+    std_amount = float(stats['std'] or 0)
+    amount = float(expense.amount)
     
-    # Simple threshold: 2x average or 3x median
+    # Must be over 2x the average and, for categories that vary, also an outlier by z-score
     threshold = avg_amount * 2
+    is_outlier = not std_amount or (amount - avg_amount) / std_amount > UNUSUAL_ZSCORE_THRESHOLD
     
-    if float(expense.amount) > threshold:
+    if amount > threshold and is_outlier:
         # Create notification
         Notification.create_unusual_spending_alert(
             user=user,
@@ -859,63 +943,64 @@ def detect_unusual_expense(user, expense):
     
     return False
 
+BUDGET_ALERT_INTERVAL = 24 * 60 * 60  # seconds between repeated budget alerts
+
 def check_budget_overspending(user, expense):
-    """Check if expense causes budget overspending and create notification"""
-    from .models import Notification, CategoryBudget
-    from django.db.models import Sum
-    from datetime import timedelta
-    from django.utils import timezone
-    
+    """Check if expense causes budget overspending and create notification
+
+    Repeat alerts are suppressed through cache markers, so the dedup only
+    holds across workers when the cache is shared (REDIS_URL is set).
+    """
     account = user.account
+    alerts = []
+    alert_keys = []
     
-    print(f"DEBUG: Checking budget - Limit: {account.budget_limit}, Total Expenses: {account.total_expenses}")
+    logger.debug("Checking budget - Limit: %s, Total Expenses: %s", account.budget_limit, account.total_expenses)
     
     # Check total budget
     if account.budget_limit > 0 and account.total_expenses > account.budget_limit:
-        print(f"DEBUG: Budget exceeded! Creating notification...")
-        # Check if similar notification was created in last 24 hours to avoid duplicates
-        recent_notification = Notification.objects.filter(
-            user=user,
-            notification_type='budget_alert',
-            title='💰 Budget Limit Exceeded',
-            created_at__gte=timezone.now() - timedelta(hours=24)
-        ).exists()
-        
-        if not recent_notification:
-            notification = Notification.objects.create(
+        logger.debug("Budget exceeded for user %s", user.id)
+        # Only alert once per 24 hours (cache.add is an atomic set-if-absent)
+        alert_key = f"budget_alert_total:{user.id}"
+        if cache.add(alert_key, 1, BUDGET_ALERT_INTERVAL):
+            alert_keys.append(alert_key)
+            alerts.append(Notification(
                 user=user,
                 title='💰 Budget Limit Exceeded',
                 message=f'Your total expenses (Rs.{account.total_expenses:.2f}) have exceeded your budget limit (Rs.{account.budget_limit:.2f}).',
                 notification_type='budget_alert'
-            )
-            print(f"DEBUG: Notification created with ID: {notification.id}")
+            ))
         else:
-            print(f"DEBUG: Skipping notification - recent one already exists")
+            logger.debug("Skipping budget notification - recent one already exists")
     
     # Check category budget
     try:
         category_budget = CategoryBudget.objects.get(user=user, category=expense.category)
-        category_spent = OtherExpenses.objects.filter(
-            user=user,
-            category=expense.category
-        ).aggregate(total=Sum('amount'))['total'] or 0
+        category_spent = get_category_total(user.id, expense.category)
         
         if category_spent > category_budget.limit:
-            # Check for duplicate category budget notification
-            recent_category_notification = Notification.objects.filter(
-                user=user,
-                notification_type='budget_alert',
-                title='⚠️ Category Budget Exceeded',
-                message__contains=expense.category,
-                created_at__gte=timezone.now() - timedelta(hours=24)
-            ).exists()
-            
-            if not recent_category_notification:
-                Notification.objects.create(
+            # Only alert once per category per 24 hours
+            alert_key = f"budget_alert_cat:{user.id}:{expense.category}"
+            if cache.add(alert_key, 1, BUDGET_ALERT_INTERVAL):
+                alert_keys.append(alert_key)
+                alerts.append(Notification(
                     user=user,
                     title='⚠️ Category Budget Exceeded',
                     message=f'Your {expense.category} expenses (Rs.{category_spent:.2f}) have exceeded the budget limit (Rs.{category_budget.limit:.2f}).',
                     notification_type='budget_alert'
-                )
+                ))
     except CategoryBudget.DoesNotExist:
         pass
+    except Exception:
+        cache.delete_many(alert_keys)
+        raise
+    
+    # Write all triggered alerts in a single INSERT
+    if alerts:
+        try:
+            Notification.objects.bulk_create(alerts)
+        except Exception:
+            # Release the markers so the alerts are retried on the next expense
+            cache.delete_many(alert_keys)
+            raise
+        logger.debug("Created %d budget notification(s) for user %s", len(alerts), user.id)
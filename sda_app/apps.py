@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class SdaAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'sda_app'
+    
+    def ready(self):
+        # Register signal handlers
+        from . import signals
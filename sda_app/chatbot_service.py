@@ -1,15 +1,55 @@
+import hashlib
 import os
+import re
+from asgiref.sync import sync_to_async
 from django.conf import settings
-import google.generativeai as genai
+from django.core.cache import cache
+
+
+# Chat history is kept in the shared cache so every worker sees the same conversation
+CHAT_HISTORY_TIMEOUT = 1800  # seconds of inactivity before a conversation is dropped
+MAX_HISTORY_MESSAGES = 20
+
+
+def _history_key(user_id):
+    return f"chat_hist:{user_id}"
+
+
+# Answers to opening questions are shared by all users (the model gets no
+# per-user context), so a question asked before skips the API
+ANSWER_CACHE_TIMEOUT = 24 * 60 * 60
+_NORMALIZE_RE = re.compile(r'[^a-z0-9]+')
+
+
+def _answer_key(message):
+    normalized = _NORMALIZE_RE.sub(' ', message.lower()).strip()
+    return f"chat_answer:{hashlib.sha1(normalized.encode()).hexdigest()}"
+
+
+# Topic keywords for fallback responses, compiled once (substring match, case-insensitive)
+_SAVING_RE = re.compile(r'save|saving|savings', re.IGNORECASE)
+_BUDGET_RE = re.compile(r'budget|budgeting|plan', re.IGNORECASE)
+_INVEST_RE = re.compile(r'invest|investing|investment', re.IGNORECASE)
+_DEBT_RE = re.compile(r'debt|loan|credit', re.IGNORECASE)
 
 
 class FinancialChatbotService:
+    _QUICK_TIPS = (
+        "Track every expense to understand your spending patterns",
+        "Set aside 20% of your income for savings",
+        "Create an emergency fund covering 3-6 months of expenses",
+        "Review and adjust your budget monthly",
+        "Avoid impulse purchases by waiting 24 hours before buying",
+    )
+    
     def __init__(self):
         # Set Gemini API key from environment or settings
         self.api_key = os.getenv("GEMINI_API_KEY") or getattr(settings, 'GEMINI_API_KEY', None)
         self.enabled = bool(self.api_key)
         if self.enabled:
             try:
+                # Imported lazily: the SDK is heavy and only needed when the API is configured
+                import google.generativeai as genai
                 genai.configure(api_key=self.api_key)
                 # Use gemini-pro (the stable v1 model)
                 self.model = genai.GenerativeModel(
@@ -21,38 +61,42 @@ class FinancialChatbotService:
                         "max_output_tokens": 2048,
                     }
                 )
-                self.chat_sessions = {}  # Store chat sessions per user
             except Exception as e:
                 print(f"Gemini API initialization error: {e}")
                 self.enabled = False
     
 
     
-    def generate_response(self, message, user=None):
-        """Generate chatbot response with conversation context"""
+    async def generate_response(self, message, user=None):
+        """Generate chatbot response with conversation context (awaits the API without blocking)"""
         if not self.enabled:
             return self._generic_response(message)
         
+        user_id = user.id if user else 'anonymous'
         try:
-            # Get or create chat session for user
-            user_id = user.id if user else 'anonymous'
-            if user_id not in self.chat_sessions:
-                # Create new chat session with system instruction
-                system_instruction = "You are PaisaPro AI, a friendly and knowledgeable financial advisor assistant. Provide practical, personalized financial advice in a conversational tone. Keep responses concise but helpful."
-                
-                # Add user context if available
-                if user and hasattr(user, 'account'):
-                    account = user.account
-                    system_instruction += f"\n\nUser's Current Financial Situation:\n- Monthly Income: ${account.monthly_income}\n- Current Balance: ${account.current_balance}\n- Savings: ${account.savings}\n- Total Expenses: ${account.total_expenses}\n- Budget Limit: ${account.budget_limit}"
-                
-                # Start new chat
-                self.chat_sessions[user_id] = self.model.start_chat(history=[])
+            # Get stored conversation for user
+            history = await cache.aget(_history_key(user_id), [])
+            if not history:
+                # Opening questions don't depend on earlier turns, so reuse a previous answer
+                cached_answer = await cache.aget(_answer_key(message))
+                if cached_answer:
+                    history = [
+                        {'role': 'user', 'parts': [message]},
+                        {'role': 'model', 'parts': [cached_answer]},
+                    ]
+                    await cache.aset(_history_key(user_id), history, CHAT_HISTORY_TIMEOUT)
+                    return cached_answer
             
-            # Get chat session
-            chat = self.chat_sessions[user_id]
+            # Rebuild the chat session from stored history (cheap, no network call)
+            chat = self.model.start_chat(history=history)
             
-            # Send message and get response
-            response = chat.send_message(message)
+            # Send message and get response. The blocking client runs in a worker
+            # thread: the SDK's asyncio client binds to the first event loop it
+            # sees, and under WSGI every request runs on a new loop
+            response = await sync_to_async(chat.send_message, thread_sensitive=False)(message)
+            await cache.aset(_history_key(user_id), self._serialize_history(chat.history), CHAT_HISTORY_TIMEOUT)
+            if not history:
+                await cache.aset(_answer_key(message), response.text, ANSWER_CACHE_TIMEOUT)
             return response.text
             
         except Exception as e:
@@ -60,18 +104,24 @@ class FinancialChatbotService:
             print(f"Gemini API error: {error_msg}")
             # Clear failed session
             if user:
-                self.chat_sessions.pop(user.id, None)
+                await cache.adelete(_history_key(user.id))
             
             # Return error message instead of generic response
             return f"I'm having trouble connecting to the AI service right now. Error: {error_msg}\n\nPlease check your GEMINI_API_KEY in the .env file and ensure you have API quota available."
     
 
     
+    @staticmethod
+    def _serialize_history(history):
+        """Convert chat history to plain dicts, keeping only the most recent messages"""
+        return [
+            {'role': content.role, 'parts': [part.text for part in content.parts]}
+            for content in history[-MAX_HISTORY_MESSAGES:]
+        ]
+    
     def _generic_response(self, message):
         """Generic helpful responses when API is unavailable"""
-        message_lower = message.lower()
-        
-        if any(word in message_lower for word in ['save', 'saving', 'savings']):
+        if _SAVING_RE.search(message):
             return """Here are some effective saving strategies:
 
 1. **50/30/20 Rule**: Allocate 50% to needs, 30% to wants, and 20% to savings
@@ -80,7 +130,7 @@ class FinancialChatbotService:
 4. **Cut Unnecessary Expenses**: Review subscriptions and recurring costs
 5. **High-Yield Savings**: Use accounts with better interest rates"""
         
-        elif any(word in message_lower for word in ['budget', 'budgeting', 'plan']):
+        elif _BUDGET_RE.search(message):
             return """Creating an effective budget:
 
 1. **Track Income**: Know exactly what you earn monthly
@@ -89,7 +139,7 @@ class FinancialChatbotService:
 4. **Monitor Progress**: Review weekly and adjust as needed
 5. **Use Tools**: Leverage apps like PaisaPro to track automatically"""
         
-        elif any(word in message_lower for word in ['invest', 'investing', 'investment']):
+        elif _INVEST_RE.search(message):
             return """Investment basics for beginners:
 
 1. **Start Early**: Time in the market beats timing the market
@@ -98,7 +148,7 @@ class FinancialChatbotService:
 4. **Low-Cost Index Funds**: Great for beginners
 5. **Long-term Mindset**: Invest for 5+ years minimum"""
         
-        elif any(word in message_lower for word in ['debt', 'loan', 'credit']):
+        elif _DEBT_RE.search(message):
             return """Managing debt effectively:
 
 1. **List All Debts**: Know what you owe and interest rates
@@ -121,18 +171,21 @@ What would you like to know more about?"""
     def clear_chat_history(self, user=None):
         """Clear chat history for a user"""
         user_id = user.id if user else 'anonymous'
-        if user_id in self.chat_sessions:
-            del self.chat_sessions[user_id]
-            return True
-        return False
+        return cache.delete(_history_key(user_id))
     
     def get_quick_tips(self, user=None):
         """Get quick financial tips"""
-        tips = [
-            "Track every expense to understand your spending patterns",
-            "Set aside 20% of your income for savings",
-            "Create an emergency fund covering 3-6 months of expenses",
-            "Review and adjust your budget monthly",
-            "Avoid impulse purchases by waiting 24 hours before buying"
-        ]
-        return tips
+        return self._QUICK_TIPS
+
+
+# The service keeps no per-request state (history lives in the cache), so one
+# instance per process is shared; it is created on first use to keep imports light
+_chatbot_service = None
+
+
+def get_chatbot_service():
+    """Return the shared chatbot service, creating it on first use"""
+    global _chatbot_service
+    if _chatbot_service is None:
+        _chatbot_service = FinancialChatbotService()
+    return _chatbot_service
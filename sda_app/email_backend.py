@@ -0,0 +1,65 @@
+import smtplib
+import threading
+import time
+
+from django.core.mail.backends.smtp import EmailBackend
+
+
+class PooledSMTPEmailBackend(EmailBackend):
+    """SMTP backend that reuses open connections between sends instead of
+    doing a fresh connect + TLS + login handshake for every email"""
+
+    # Connections idle longer than this are closed rather than reused
+    IDLE_TIMEOUT = 300  # seconds
+
+    # One pool per thread: smtplib connections are not safe to share across threads
+    _local = threading.local()
+
+    @classmethod
+    def _pool(cls):
+        if not hasattr(cls._local, 'connections'):
+            cls._local.connections = {}
+        return cls._local.connections
+
+    def _pool_key(self):
+        return (self.host, self.port, self.username)
+
+    def open(self):
+        """Take a live pooled connection if there is one, otherwise open a new one"""
+        if self.connection:
+            return False
+
+        pooled = self._pool().pop(self._pool_key(), None)
+        if pooled:
+            connection, last_used = pooled
+            if time.monotonic() - last_used < self.IDLE_TIMEOUT and self._is_alive(connection):
+                self.connection = connection
+                # Report a "new" connection so send_messages() calls close(), which returns it to the pool
+                return True
+            self._discard(connection)
+
+        return super().open()
+
+    def close(self):
+        """Return the connection to the pool instead of sending QUIT"""
+        if self.connection is None:
+            return
+        previous = self._pool().get(self._pool_key())
+        if previous:
+            self._discard(previous[0])
+        self._pool()[self._pool_key()] = (self.connection, time.monotonic())
+        self.connection = None
+
+    @staticmethod
+    def _is_alive(connection):
+        try:
+            return connection.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    @staticmethod
+    def _discard(connection):
+        try:
+            connection.quit()
+        except (smtplib.SMTPException, OSError):
+            connection.close()
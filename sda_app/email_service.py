@@ -1,80 +1,125 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
 from django.core.mail import send_mail
 from django.conf import settings
-from django.utils.html import strip_tags
+from django.template.loader import render_to_string
 
+logger = logging.getLogger(__name__)
 
-class OTPService:
-    """Service class for handling OTP email operations"""
+# Emails are sent from a few background threads so views don't wait on SMTP
+EMAIL_WORKERS = 4
+EMAIL_MAX_RETRIES = 3
+EMAIL_RETRY_BACKOFF = 2  # seconds, doubled after each failed attempt
+EMAIL_SHUTDOWN_TIMEOUT = 5  # seconds in-flight sends get to finish at exit
+
+# Daemon threads fed from a queue rather than a ThreadPoolExecutor: the
+# interpreter joins executor threads at exit with no timeout, so a hanging
+# SMTP server could hold up shutdown indefinitely
+_email_queue = queue.SimpleQueue()
+_email_workers = []
+_workers_lock = threading.Lock()
+_shutting_down = threading.Event()
+
+
+def _email_worker():
+    while True:
+        item = _email_queue.get()
+        if item is None:
+            return
+        future, args = item
+        if not future.set_running_or_notify_cancel():
+            continue
+        try:
+            future.set_result(_deliver(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+
+def _start_email_workers():
+    with _workers_lock:
+        if _email_workers:
+            return
+        for i in range(EMAIL_WORKERS):
+            worker = threading.Thread(target=_email_worker, name=f'email_{i}', daemon=True)
+            worker.start()
+            _email_workers.append(worker)
+
+
+def _shutdown_email_workers():
+    """Drop queued emails, stop retrying and give in-flight sends a bounded time to finish"""
+    _shutting_down.set()
+    while True:
+        try:
+            item = _email_queue.get_nowait()
+        except queue.Empty:
+            break
+        if item is not None:
+            item[0].cancel()
+    for _ in _email_workers:
+        _email_queue.put(None)
+    deadline = time.monotonic() + EMAIL_SHUTDOWN_TIMEOUT
+    for worker in _email_workers:
+        worker.join(max(0, deadline - time.monotonic()))
+
+
+atexit.register(_shutdown_email_workers)
+
+
+# Plain-text bodies are fixed text around a single value, so they are built once here
+_OTP_PLAIN_PRE = (
+    "PaisaPro Email Verification\n\n"
+    "Hello,\n\n"
+    "Your verification code is: "
+)
+_OTP_PLAIN_POST = (
+    "\n\nThis code will expire in 10 minutes.\n"
+    "If you didn't request this code, please ignore this email.\n\n"
+    "© 2025 PaisaPro. All rights reserved.\n"
+)
+_WELCOME_PLAIN_PRE = "Welcome to PaisaPro, "
+_WELCOME_PLAIN_POST = (
+    "!\n\n"
+    "Your account has been successfully created.\n\n"
+    "Start managing your finances with our powerful tools:\n"
+    "- Track expenses by category\n"
+    "- Set budget limits\n"
+    "- Monitor savings goals\n"
+    "- Get AI-powered financial insights\n"
+)
+_MEMBERSHIP_PLAIN_PRE = "🎉 Congratulations "
+_MEMBERSHIP_PLAIN_POST = (
+    "!\n"
+    "✨ Paisa Pro Member ✨\n\n"
+    "Welcome to the Paisa Pro family! Your account has been successfully verified "
+    "and you now have full access to all premium features.\n\n"
+    "🎁 Your Membership Benefits:\n"
+    "- 💰 Smart Budget Tracking: Set limits and get instant alerts when you're overspending\n"
+    "- 📊 Detailed Reports: Visual spending reports with category breakdowns\n"
+    "- 🤖 AI Financial Advisor: Get personalized financial advice powered by AI\n"
+    "- 🎯 Savings Goals: Set and track your savings goals automatically\n"
+    "- 🔍 Expense Analysis: Detect unusual expenses and spending patterns\n"
+    "- 📧 Smart Alerts: Email notifications for important financial events\n\n"
+    "Get Started Now:\n"
+    "1. Set your monthly income (optional but recommended)\n"
+    "2. Add your first expense to start tracking\n"
+    "3. Set a budget limit to stay on track\n"
+    "4. Chat with our AI advisor for personalized tips\n\n"
+    "Go to Dashboard: http://localhost:3000/dashboard\n\n"
+    "Need help? Contact us anytime!\n"
+    "© 2025 PaisaPro. All rights reserved.\n"
+)
+
+
+def _deliver(subject, plain_message, html_message, email, sent_message):
+    """Send an email, retrying transient failures with exponential backoff
     
-    @staticmethod
-    def send_otp_email(email, otp_code):
-        """Send OTP code to user's email"""
-        subject = 'PaisaPro - Email Verification Code'
-        
-        html_message = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                    background-color: #f4f4f4;
-                    margin: 0;
-                    padding: 20px;
-                }}
-                .container {{
-                    max-width: 600px;
-                    margin: 0 auto;
-                    background-color: white;
-                    padding: 30px;
-                    border-radius: 10px;
-                    box-shadow: 0 4px 6px rgba(0,0,0,0.1);
-                }}
-                .header {{
-                    text-align: center;
-                    color: #007bff;
-                    margin-bottom: 30px;
-                }}
-                .otp-code {{
-                    background-color: #f8f9fa;
-                    border: 2px solid #007bff;
-                    border-radius: 8px;
-                    padding: 20px;
-                    text-align: center;
-                    font-size: 32px;
-                    font-weight: bold;
-                    color: #007bff;
-                    margin: 20px 0;
-                    letter-spacing: 5px;
-                }}
-                .footer {{
-                    text-align: center;
-                    color: #6c757d;
-                    margin-top: 30px;
-                    font-size: 14px;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>PaisaPro Email Verification</h1>
-                </div>
-                <p>Hello,</p>
-                <p>Your verification code is:</p>
-                <div class="otp-code">{otp_code}</div>
-                <p>This code will expire in 10 minutes.</p>
-                <p>If you didn't request this code, please ignore this email.</p>
-                <div class="footer">
-                    <p>© 2025 PaisaPro. All rights reserved.</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        plain_message = strip_tags(html_message)
-        
+    Returns (success, message) like the send helpers did when they were synchronous.
+    """
+    for attempt in range(EMAIL_MAX_RETRIES + 1):
         try:
             send_mail(
                 subject,
@@ -84,225 +129,63 @@ class OTPService:
                 html_message=html_message,
                 fail_silently=False,
             )
-            return True, 'OTP sent successfully'
+            return True, sent_message
         except Exception as e:
-            return False, str(e)
+            # Waiting on the shutdown event keeps the backoff interruptible at exit
+            if attempt == EMAIL_MAX_RETRIES or _shutting_down.wait(EMAIL_RETRY_BACKOFF * 2 ** attempt):
+                logger.exception("Sending %r to %s failed", subject, email)
+                return False, str(e)
+
+
+def _queue_email(subject, plain_message, html_message, email, sent_message):
+    """Hand an email to the background workers and return its Future immediately"""
+    future = Future()
+    if _shutting_down.is_set():
+        future.cancel()
+        return future
+    _start_email_workers()
+    _email_queue.put((future, (subject, plain_message, html_message, email, sent_message)))
+    return future
+
+
+class OTPService:
+    """Service class for handling OTP email operations
+    
+    Emails are sent in the background (fire-and-forget): each send method
+    returns at once with a Future resolving to (success, message). Callers
+    that need the delivery result can call .result() on it; failures are
+    also logged after the last retry.
+    """
+    
+    @staticmethod
+    def send_otp_email(email, otp_code):
+        """Send OTP code to user's email"""
+        subject = 'PaisaPro - Email Verification Code'
+        
+        html_message = render_to_string('emails/otp_email.html', {'otp_code': otp_code})
+        
+        plain_message = _OTP_PLAIN_PRE + otp_code + _OTP_PLAIN_POST
+        
+        return _queue_email(subject, plain_message, html_message, email, 'OTP sent successfully')
     
     @staticmethod
     def send_welcome_email(email, username):
         """Send welcome email to new user"""
         subject = 'Welcome to PaisaPro!'
         
-        html_message = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                    background-color: #f4f4f4;
-                    margin: 0;
-                    padding: 20px;
-                }}
-                .container {{
-                    max-width: 600px;
-                    margin: 0 auto;
-                    background-color: white;
-                    padding: 30px;
-                    border-radius: 10px;
-                    box-shadow: 0 4px 6px rgba(0,0,0,0.1);
-                }}
-                .header {{
-                    text-align: center;
-                    color: #28a745;
-                    margin-bottom: 30px;
-                }}
-                .button {{
-                    display: inline-block;
-                    padding: 12px 30px;
-                    background-color: #007bff;
-                    color: white;
-                    text-decoration: none;
-                    border-radius: 5px;
-                    margin: 20px 0;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>Welcome to PaisaPro, {username}!</h1>
-                </div>
-                <p>Your account has been successfully created.</p>
-                <p>Start managing your finances with our powerful tools:</p>
-                <ul>
-                    <li>Track expenses by category</li>
-                    <li>Set budget limits</li>
-                    <li>Monitor savings goals</li>
-                    <li>Get AI-powered financial insights</li>
-                </ul>
-                <p style="text-align: center;">
-                    <a href="#" class="button">Get Started</a>
-                </p>
-            </div>
-        </body>
-        </html>
-        """
+        html_message = render_to_string('emails/welcome_email.html', {'username': username})
         
-        plain_message = strip_tags(html_message)
+        plain_message = _WELCOME_PLAIN_PRE + username + _WELCOME_PLAIN_POST
         
-        try:
-            send_mail(
-                subject,
-                plain_message,
-                settings.DEFAULT_FROM_EMAIL,
-                [email],
-                html_message=html_message,
-                fail_silently=False,
-            )
-            return True, 'Welcome email sent'
-        except Exception as e:
-            return False, str(e)
+        return _queue_email(subject, plain_message, html_message, email, 'Welcome email sent')
     
     @staticmethod
     def send_membership_email(email, full_name):
         """Send Paisa Pro membership email to new user"""
         subject = '🎉 Welcome to Paisa Pro Membership!'
         
-        html_message = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                    background-color: #f4f4f4;
-                    margin: 0;
-                    padding: 20px;
-                }}
-                .container {{
-                    max-width: 600px;
-                    margin: 0 auto;
-                    background-color: white;
-                    padding: 30px;
-                    border-radius: 10px;
-                    box-shadow: 0 4px 6px rgba(0,0,0,0.1);
-                }}
-                .header {{
-                    text-align: center;
-                    color: #28a745;
-                    margin-bottom: 30px;
-                }}
-                .badge {{
-                    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                    color: white;
-                    padding: 15px 30px;
-                    border-radius: 25px;
-                    font-size: 18px;
-                    font-weight: bold;
-                    display: inline-block;
-                    margin: 20px 0;
-                }}
-                .benefits {{
-                    background-color: #f8f9fa;
-                    padding: 20px;
-                    border-radius: 8px;
-                    margin: 20px 0;
-                }}
-                .benefit-item {{
-                    padding: 10px 0;
-                    border-bottom: 1px solid #dee2e6;
-                }}
-                .benefit-item:last-child {{
-                    border-bottom: none;
-                }}
-                .button {{
-                    display: inline-block;
-                    padding: 12px 30px;
-                    background-color: #28a745;
-                    color: white;
-                    text-decoration: none;
-                    border-radius: 5px;
-                    margin: 20px 0;
-                }}
-                .footer {{
-                    text-align: center;
-                    color: #6c757d;
-                    margin-top: 30px;
-                    font-size: 14px;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>🎉 Congratulations {full_name}!</h1>
-                    <p style="text-align: center;">
-                        <span class="badge">✨ Paisa Pro Member ✨</span>
-                    </p>
-                </div>
-                <p>Welcome to the Paisa Pro family! Your account has been successfully verified and you now have full access to all premium features.</p>
-                
-                <div class="benefits">
-                    <h3 style="margin-top: 0; color: #007bff;">🎁 Your Membership Benefits:</h3>
-                    <div class="benefit-item">
-                        <strong>💰 Smart Budget Tracking</strong><br>
-                        Set limits and get instant alerts when you're overspending
-                    </div>
-                    <div class="benefit-item">
-                        <strong>📊 Detailed Reports</strong><br>
-                        Visual spending reports with category breakdowns
-                    </div>
-                    <div class="benefit-item">
-                        <strong>🤖 AI Financial Advisor</strong><br>
-                        Get personalized financial advice powered by AI
-                    </div>
-                    <div class="benefit-item">
-                        <strong>🎯 Savings Goals</strong><br>
-                        Set and track your savings goals automatically
-                    </div>
-                    <div class="benefit-item">
-                        <strong>🔍 Expense Analysis</strong><br>
-                        Detect unusual expenses and spending patterns
-                    </div>
-                    <div class="benefit-item">
-                        <strong>📧 Smart Alerts</strong><br>
-                        Email notifications for important financial events
-                    </div>
-                </div>
-                
-                <p><strong>Get Started Now:</strong></p>
-                <ol>
-                    <li>Set your monthly income (optional but recommended)</li>
-                    <li>Add your first expense to start tracking</li>
-                    <li>Set a budget limit to stay on track</li>
-                    <li>Chat with our AI advisor for personalized tips</li>
-                </ol>
-                
-                <p style="text-align: center;">
-                    <a href="http://localhost:3000/dashboard" class="button">Go to Dashboard</a>
-                </p>
-                
-                <div class="footer">
-                    <p>Need help? Contact us anytime!</p>
-                    <p>© 2025 PaisaPro. All rights reserved.</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
+        html_message = render_to_string('emails/membership_email.html', {'full_name': full_name})
         
-        plain_message = strip_tags(html_message)
+        plain_message = _MEMBERSHIP_PLAIN_PRE + full_name + _MEMBERSHIP_PLAIN_POST
         
-        try:
-            send_mail(
-                subject,
-                plain_message,
-                settings.DEFAULT_FROM_EMAIL,
-                [email],
-                html_message=html_message,
-                fail_silently=False,
-            )
-            return True, 'Membership email sent'
-        except Exception as e:
-            return False, str(e)
+        return _queue_email(subject, plain_message, html_message, email, 'Membership email sent')
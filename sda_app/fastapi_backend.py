@@ -6,8 +6,10 @@ from typing import List, Optional, Dict, Any
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import asyncio
 from threading import Lock
+from collections import OrderedDict
+import queue
 import requests
 import yfinance as yf
 import xml.etree.ElementTree as ET
@@ -33,6 +35,8 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
 from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
 
 # Django setup for database access
 import os
@@ -127,6 +131,8 @@ class ScraperConfig:
     scroll_delay: int = 2
     max_workers: int = 2
     sort_by_price: bool = True
+    result_cache_ttl: int = 900  # Seconds a find_products() result is reused
+    result_cache_size: int = 512
 
 
 # ============================================================================
@@ -698,33 +704,35 @@ class CurrencyConverter:
 class PriceExtractor:
     """Extracts price from text using various patterns"""
     
-    PRICE_PATTERNS = [
-        r"Rs\.?\s*([\d,]+)",
-        r"PKR\.?\s*([\d,]+)",
-        r"₨\.?\s*([\d,]+)",
-        r"\b([\d,]+)\s*Rs",
-        r"\b([\d,]+)\s*PKR"
-    ]
+    # Currency before the amount ("Rs. 1,200", "PKR 1200", "₨1200") or after it ("1,200 Rs"),
+    # compiled once as a single alternation so each text is scanned in one pass
+    PRICE_RE = re.compile(
+        r"(?:Rs|PKR|₨)\.?\s*([\d,]+)|\b([\d,]+)\s*(?:Rs|PKR)",
+        re.IGNORECASE
+    )
     
-    @staticmethod
-    def extract(text: str) -> Optional[float]:
+    @classmethod
+    def extract(cls, text: str) -> Optional[float]:
         """Extract numeric price from text"""
         if not text:
             return None
         
-        for pattern in PriceExtractor.PRICE_PATTERNS:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                try:
-                    return float(match.group(1).replace(",", ""))
-                except (ValueError, AttributeError):
-                    continue
+        for match in cls.PRICE_RE.finditer(text):
+            try:
+                return float((match.group(1) or match.group(2)).replace(",", ""))
+            except ValueError:  # Only commas matched, e.g. "Rs ,"
+                continue
         return None
 
 
 class WebDriverFactory:
     """Factory for creating WebDriver instances"""
     
+    USER_AGENT = (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+    )
+    
     @staticmethod
     def create_driver(headless: bool = True) -> webdriver.Chrome:
         """Create a configured Chrome WebDriver"""
@@ -773,10 +781,7 @@ class WebDriverFactory:
         options.add_argument("--disable-blink-features=AutomationControlled")
         options.add_experimental_option("excludeSwitches", ["enable-automation", "enable-logging"])
         options.add_experimental_option('useAutomationExtension', False)
-        options.add_argument(
-            "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-        )
+        options.add_argument(f"user-agent={WebDriverFactory.USER_AGENT}")
         
         driver = webdriver.Chrome(options=options)
         driver.set_page_load_timeout(60)
@@ -784,6 +789,58 @@ class WebDriverFactory:
         return driver
 
 
+class WebDriverPool:
+    """Bounded pool of reusable WebDriver instances
+    
+    Starting Chrome costs a second or more, so drivers are returned here after
+    a scrape and handed to the next one instead of being quit. Drivers are
+    created lazily; at most ``size`` idle drivers are kept, extras are quit.
+    """
+    
+    def __init__(self, size: int, headless: bool = True):
+        self.headless = headless
+        self._idle: queue.Queue = queue.Queue(maxsize=size)
+    
+    def acquire(self) -> webdriver.Chrome:
+        """Check out an idle driver, or start a new one if none is alive"""
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                return WebDriverFactory.create_driver(self.headless)
+            
+            # The browser may have crashed while it sat in the pool
+            try:
+                driver.current_url
+                return driver
+            except Exception:
+                self._quit(driver)
+    
+    def release(self, driver: webdriver.Chrome):
+        """Reset a driver's session state and return it to the pool"""
+        try:
+            driver.delete_all_cookies()
+            driver.get("about:blank")
+            self._idle.put_nowait(driver)
+        except Exception:  # Browser unusable, or the pool is already full
+            self._quit(driver)
+    
+    def close(self):
+        """Quit every idle driver"""
+        while True:
+            try:
+                self._quit(self._idle.get_nowait())
+            except queue.Empty:
+                return
+    
+    @staticmethod
+    def _quit(driver: webdriver.Chrome):
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+
 class ConsoleOutputHandler(IOutputHandler):
     """Console output handler"""
     def write(self, message: str):
@@ -813,11 +870,12 @@ class NoSorting(ISortingStrategy):
 class BaseProductScraper(IProductScraper):
     """Base scraper implementing common workflow"""
     
-    def __init__(self, config: ScraperConfig, output: IOutputHandler):
+    def __init__(self, config: ScraperConfig, output: IOutputHandler, driver_pool: Optional[WebDriverPool] = None):
         self.config = config
         self.output = output
         self.currency_converter = CurrencyConverter(config.exchange_rate)
         self.price_extractor = PriceExtractor()
+        self.driver_pool = driver_pool
         self._driver: Optional[webdriver.Chrome] = None
     
     def scrape(self, query: str, sort_by_price: bool = True) -> List[Dict[str, Any]]:
@@ -856,8 +914,11 @@ class BaseProductScraper(IProductScraper):
     
     # Common implementations
     def _initialize_driver(self):
-        """Initialize WebDriver"""
-        self._driver = WebDriverFactory.create_driver(self.config.headless)
+        """Initialize WebDriver (checked out from the pool when one is set)"""
+        if self.driver_pool:
+            self._driver = self.driver_pool.acquire()
+        else:
+            self._driver = WebDriverFactory.create_driver(self.config.headless)
     
     def _wait_for_page_load(self):
         """Wait for initial page load"""
@@ -877,12 +938,46 @@ class BaseProductScraper(IProductScraper):
         return products
     
     def _cleanup(self):
-        """Clean up resources"""
+        """Clean up resources (pooled drivers are returned, not quit)"""
         if self._driver:
-            try:
-                self._driver.quit()
-            except:
-                pass
+            if self.driver_pool:
+                self.driver_pool.release(self._driver)
+            else:
+                try:
+                    self._driver.quit()
+                except:
+                    pass
+            self._driver = None
+
+
+# ============================================================================
+# LXML HELPERS
+# ============================================================================
+
+def _has_class(name: str) -> str:
+    """XPath predicate matching the CSS class selector ``.name``"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def _element_text(element) -> str:
+    """All text inside an lxml element (BeautifulSoup's ``get_text()``)"""
+    return ''.join(element.itertext())
+
+
+def _parse_html(html: str):
+    """Parse a page with lxml, or return None for an empty document"""
+    if not html or not html.strip():
+        return None
+    return lxml.html.fromstring(html)
+
+
+def _first_match(xpaths: List[etree.XPath], node) -> List[Any]:
+    """Results of the first XPath that matches anything under node"""
+    for xpath in xpaths:
+        elements = xpath(node)
+        if elements:
+            return elements
+    return []
 
 
 # ============================================================================
@@ -890,14 +985,84 @@ class BaseProductScraper(IProductScraper):
 # ============================================================================
 
 class AlfatahScraper(BaseProductScraper):
-    """Scraper for Alfatah.pk"""
+    """Scraper for Alfatah.pk
+    
+    The search page is server-rendered, so it is fetched over plain HTTP;
+    the Selenium workflow is only used when that returns no products.
+    """
+    
+    HTTP_TIMEOUT = 10
+    # Compiled once; tried in order, the first one that matches wins
+    CONTAINER_XPATHS = [
+        ("div.card-wrapper", etree.XPath(f"//div[{_has_class('card-wrapper')}]")),
+        ("div.product-item", etree.XPath(f"//div[{_has_class('product-item')}]")),
+        ("article.card", etree.XPath(f"//article[{_has_class('card')}]")),
+        ("li.grid__item", etree.XPath(f"//li[{_has_class('grid__item')}]")),
+        ("div.product-card", etree.XPath(f"//div[{_has_class('product-card')}]")),
+    ]
+    TITLE_XPATHS = [
+        etree.XPath(f".//a[{_has_class('product-title-ellipsis')}]"),
+        etree.XPath(".//h3//a"),
+        etree.XPath(f".//div[{_has_class('card__heading')}]//a"),
+        etree.XPath(f".//*[{_has_class('card__content')}]//a"),
+    ]
+    LINK_XPATH = etree.XPath(".//a[contains(@href, '/products/')]/@href")
+    # span/div/p elements whose class mentions "price" in any case
+    PRICE_XPATH = etree.XPath(
+        ".//*[self::span or self::div or self::p]"
+        "[contains(translate(@class, 'PRICE', 'price'), 'price')]"
+    )
+    
+    def __init__(self, config: ScraperConfig, output: IOutputHandler,
+                 driver_pool: Optional[WebDriverPool] = None,
+                 session: Optional[requests.Session] = None):
+        super().__init__(config, output, driver_pool)
+        self._session = session or requests.Session()
     
     def get_source_name(self) -> str:
         return "Alfatah"
     
+    def scrape(self, query: str, sort_by_price: bool = True) -> List[Dict[str, Any]]:
+        try:
+            containers = self._find_containers(self._fetch_html(query))
+        except requests.RequestException as e:
+            self.output.write(f"   ⚠️ Alfatah HTTP fetch failed ({e}), using browser...")
+            containers = []
+        
+        if not containers:
+            return super().scrape(query, sort_by_price)
+        
+        products = self._parse_products(containers[:self.config.max_results])
+        return self._sort_products(products, sort_by_price)
+    
+    def _search_url(self, query: str) -> str:
+        return f"https://alfatah.pk/search?q={quote_plus(query)}"
+    
+    def _fetch_html(self, query: str) -> str:
+        """Fetch the search results page without a browser"""
+        response = self._session.get(
+            self._search_url(query),
+            headers={'User-Agent': WebDriverFactory.USER_AGENT},
+            timeout=self.HTTP_TIMEOUT
+        )
+        response.raise_for_status()
+        return response.text
+    
+    def _find_containers(self, html: str) -> List[Any]:
+        """Find product cards using the first container XPath that matches"""
+        root = _parse_html(html)
+        if root is None:
+            return []
+        
+        for selector, xpath in self.CONTAINER_XPATHS:
+            containers = xpath(root)
+            if containers:
+                self.output.write(f"   📦 Using selector: {selector} ({len(containers)} found)")
+                return containers
+        return []
+    
     def _navigate_to_search(self, query: str):
-        encoded_query = quote_plus(query)
-        url = f"https://alfatah.pk/search?q={encoded_query}"
+        url = self._search_url(query)
         if self._driver:
             max_retries = 2
             for attempt in range(max_retries):
@@ -915,24 +1080,7 @@ class AlfatahScraper(BaseProductScraper):
         if not self._driver:
             return []
         
-        soup = BeautifulSoup(self._driver.page_source, "html.parser")
-        
-        container_patterns = [
-            "div.card-wrapper",
-            "div.product-item",
-            "article.card",
-            "li.grid__item",
-            "div.product-card",
-        ]
-        
-        containers = []
-        for pattern in container_patterns:
-            containers = soup.select(pattern)
-            if containers:
-                self.output.write(f"   📦 Using selector: {pattern} ({len(containers)} found)")
-                break
-        
-        return containers[:self.config.max_results]
+        return self._find_containers(self._driver.page_source)[:self.config.max_results]
     
     def _parse_products(self, raw_data: List[Any]) -> List[Dict[str, Any]]:
         products = []
@@ -960,42 +1108,49 @@ class AlfatahScraper(BaseProductScraper):
         return products
     
     def _extract_title(self, container) -> Optional[str]:
-        selectors = [
-            "a.product-title-ellipsis",
-            "h3 a",
-            "div.card__heading a",
-            ".card__content a"
-        ]
-        
-        for selector in selectors:
-            elem = container.select_one(selector)
-            if elem and elem.text.strip():
-                return elem.text.strip()
+        for xpath in self.TITLE_XPATHS:
+            elements = xpath(container)
+            if elements:
+                title = _element_text(elements[0]).strip()
+                if title:
+                    return title
         return None
     
     def _extract_link(self, container) -> Optional[str]:
-        link_elem = container.select_one("a[href*='/products/']")
-        if link_elem and link_elem.get('href'):
-            href = link_elem['href']
+        hrefs = self.LINK_XPATH(container)
+        if hrefs and hrefs[0]:
+            href = hrefs[0]
             return href if href.startswith('http') else f"https://alfatah.pk{href}"
         return None
     
     def _extract_price(self, container) -> Optional[float]:
-        price_elements = container.select("span, div, p")
-        for elem in price_elements:
-            elem_class = ' '.join(elem.get('class', []))
-            if 'price' in elem_class.lower():
-                price = self.price_extractor.extract(elem.text)
-                if price:
-                    return price
-        
-        all_text = container.get_text()
+        for elem in self.PRICE_XPATH(container):
+            price = self.price_extractor.extract(_element_text(elem))
+            if price:
+                return price
+        
+        all_text = _element_text(container)
         return self.price_extractor.extract(all_text)
 
 
 class DarazScraper(BaseProductScraper):
     """Scraper for Daraz.pk"""
     
+    # Compiled once; within each list the first XPath that matches wins
+    ITEM_XPATHS = [
+        etree.XPath(f"//*[{_has_class('Ms6aG')}]"),
+        etree.XPath("//*[@data-qa-locator='product-item']"),
+        etree.XPath(f"//*[{_has_class('gridItem')}]"),
+    ]
+    TITLE_XPATHS = [
+        etree.XPath(f".//*[{_has_class('RfADt')}]//a"),
+        etree.XPath(".//a[@title]"),
+    ]
+    PRICE_XPATHS = [
+        etree.XPath(f".//*[{_has_class('ooOxS')}]"),
+        etree.XPath(f".//*[{_has_class('price')}]"),
+    ]
+    
     def get_source_name(self) -> str:
         return "Daraz"
     
@@ -1008,39 +1163,28 @@ class DarazScraper(BaseProductScraper):
         if not self._driver:
             return []
         
-        try:
-            soup = BeautifulSoup(self._driver.page_source, "lxml")
-        except:
-            soup = BeautifulSoup(self._driver.page_source, "html.parser")
-        
-        items = soup.select(".Ms6aG")
-        if not items:
-            items = soup.select("[data-qa-locator='product-item']")
-        if not items:
-            items = soup.select(".gridItem")
+        root = _parse_html(self._driver.page_source)
+        if root is None:
+            return []
         
-        return items[:self.config.max_results]
+        return _first_match(self.ITEM_XPATHS, root)[:self.config.max_results]
     
     def _parse_products(self, raw_data: List[Any]) -> List[Dict[str, Any]]:
         products = []
         
         for item in raw_data:
-            title_tag = item.select_one(".RfADt a")
-            if not title_tag:
-                title_tag = item.select_one("a[title]")
-            
-            price_tag = item.select_one(".ooOxS")
-            if not price_tag:
-                price_tag = item.select_one(".price")
+            title_tags = _first_match(self.TITLE_XPATHS, item)
+            price_tags = _first_match(self.PRICE_XPATHS, item)
             
-            if not (title_tag and price_tag):
+            if not (title_tags and price_tags):
                 continue
             
-            title = title_tag.text.strip()
+            title_tag = title_tags[0]
+            title = _element_text(title_tag).strip()
             href = title_tag.get("href")
             link = "https:" + href if href and href.startswith("//") else (href or "N/A")
             
-            price_pkr = self.price_extractor.extract(price_tag.text)
+            price_pkr = self.price_extractor.extract(_element_text(price_tags[0]))
             if not price_pkr:
                 continue
             
@@ -1060,8 +1204,9 @@ class DarazScraper(BaseProductScraper):
 class ImtiazScraper(BaseProductScraper):
     """Scraper for Imtiaz.pk"""
     
-    def __init__(self, config: ScraperConfig, output: IOutputHandler, city: str = "Askari 1"):
-        super().__init__(config, output)
+    def __init__(self, config: ScraperConfig, output: IOutputHandler, city: str = "Askari 1",
+                 driver_pool: Optional[WebDriverPool] = None):
+        super().__init__(config, output, driver_pool)
         self.city = city
     
     def get_source_name(self) -> str:
@@ -1292,10 +1437,15 @@ class ScraperFactory:
         if not scraper_cls:
             raise ValueError(f"Unknown scraper: {key}")
         
+        driver_pool = kwargs.get('driver_pool')
+        
         # Pass city parameter to Imtiaz scraper
         if key.lower() == 'imtiaz' and 'city' in kwargs:
-            return scraper_cls(config, output, city=kwargs['city'])
-        return scraper_cls(config, output)
+            return scraper_cls(config, output, city=kwargs['city'], driver_pool=driver_pool)
+        # Alfatah fetches over HTTP and can share a pooled session
+        if key.lower() == 'alfatah' and 'session' in kwargs:
+            return scraper_cls(config, output, driver_pool=driver_pool, session=kwargs['session'])
+        return scraper_cls(config, output, driver_pool=driver_pool)
     
     @classmethod
     def get_available_scrapers(cls) -> List[str]:
@@ -1320,11 +1470,40 @@ class PriceComparisonService:
         self.config = config
         self.output = output
         self._print_lock = Lock()
+        # One browser per parallel scraper is kept warm between requests
+        self.driver_pool = WebDriverPool(config.max_workers, config.headless)
+        # Keep-alive connections shared by scrapers that fetch over plain HTTP
+        self.http_session = requests.Session()
+        # Recent find_products() results: key -> (expires_at, products), oldest first
+        self._results: OrderedDict = OrderedDict()
+        self._results_lock = Lock()
     
     def _thread_safe_print(self, message: str):
         with self._print_lock:
             self.output.write(message)
     
+    def _get_cached_result(self, key: tuple) -> Optional[List[Dict[str, Any]]]:
+        """Get a recent find_products() result if it hasn't expired"""
+        with self._results_lock:
+            entry = self._results.get(key)
+            if entry is None:
+                return None
+            expires_at, products = entry
+            if time.monotonic() >= expires_at:
+                del self._results[key]
+                return None
+            self._results.move_to_end(key)
+        return [dict(p) for p in products]
+    
+    def _cache_result(self, key: tuple, products: List[Dict[str, Any]]):
+        """Remember a find_products() result, evicting the least recently used"""
+        expires_at = time.monotonic() + self.config.result_cache_ttl
+        with self._results_lock:
+            self._results[key] = (expires_at, [dict(p) for p in products])
+            self._results.move_to_end(key)
+            while len(self._results) > self.config.result_cache_size:
+                self._results.popitem(last=False)
+    
     def _get_cached_products(self, query: str, source: str) -> Optional[List[Dict[str, Any]]]:
         """Get cached products if available and not stale"""
         try:
@@ -1388,9 +1567,11 @@ class PriceComparisonService:
             
             # Cache miss - scrape the source
             self._thread_safe_print(f"   🔍 Scraping {source.upper()}...")
-            kwargs = {}
+            kwargs = {'driver_pool': self.driver_pool}
             if source == 'imtiaz':
                 kwargs['city'] = 'Askari 1'
+            elif source == 'alfatah':
+                kwargs['session'] = self.http_session
             
             scraper = ScraperFactory.create_scraper(source, self.config, self.output, **kwargs)
             products = scraper.scrape(query, sort_by_price=sort_by_price)
@@ -1415,6 +1596,28 @@ class PriceComparisonService:
         sort_by_price: bool = True,
         equal_distribution: bool = False,
         parallel: bool = True
+    ) -> List[Dict[str, Any]]:
+        """Blocking wrapper around find_products_async() for callers without an event loop"""
+        return asyncio.run(self.find_products_async(
+            query, sources, top_n, sort_by_price, equal_distribution, parallel
+        ))
+    
+    async def _scrape_staggered(self, idx: int, source: str, query: str, sort_by_price: bool,
+                                slots: asyncio.Semaphore) -> List[Dict[str, Any]]:
+        """Run a blocking scraper in a worker thread, started idx seconds after the first"""
+        # Stagger scraper launches to avoid overwhelming the system and sites
+        await asyncio.sleep(idx)
+        async with slots:
+            return await asyncio.to_thread(self._scrape_single_source, source, query, sort_by_price)
+    
+    async def find_products_async(
+        self, 
+        query: str, 
+        sources: Optional[List[str]] = None,
+        top_n: int = 10,
+        sort_by_price: bool = True,
+        equal_distribution: bool = False,
+        parallel: bool = True
     ) -> List[Dict[str, Any]]:
         """
         Find products across sources with optional price sorting
@@ -1430,6 +1633,13 @@ class PriceComparisonService:
         if sources is None:
             sources = ScraperFactory.get_available_scrapers()
         
+        # Source order is part of the key: equal_distribution gives the remainder to the first sources
+        cache_key = (query.strip().lower(), tuple(sources), top_n, sort_by_price, equal_distribution)
+        cached_result = self._get_cached_result(cache_key)
+        if cached_result is not None:
+            self.output.write(f"✨ Returning recent results for '{query}' ({len(cached_result)} products)")
+            return cached_result
+        
         self.output.write(f"🔍 Searching for '{query}' across {len(sources)} sources...")
         self.output.write(f"📊 Sort by price: {'YES' if sort_by_price else 'NO'}")
         self.output.write(f"📊 Equal distribution: {'YES' if equal_distribution else 'NO'}")
@@ -1444,29 +1654,23 @@ class PriceComparisonService:
         products_by_source = {}
         
         if parallel:
-            with ThreadPoolExecutor(max_workers=self.config.max_workers) as executor:
-                # Stagger scraper launches to avoid overwhelming the system and sites
-                futures = []
-                for idx, source in enumerate(sources):
-                    # Add small delay between launching scrapers (especially for Alfatah)
-                    if idx > 0:
-                        time.sleep(1)  # 1 second stagger between each scraper
-                    
-                    future = executor.submit(self._scrape_single_source, source, query, sort_by_price)
-                    futures.append((future, source))
-                
-                # Collect results as they complete
-                for future, source in futures:
-                    try:
-                        products = future.result()
-                        products_by_source[source] = products
-                        all_products.extend(products)
-                    except Exception as e:
-                        self._thread_safe_print(f"❌ Exception for {source}: {e}")
-                        products_by_source[source] = []
+            # At most max_workers scrapers (and pooled browsers) run at once
+            slots = asyncio.Semaphore(self.config.max_workers)
+            results = await asyncio.gather(
+                *(self._scrape_staggered(idx, source, query, sort_by_price, slots)
+                  for idx, source in enumerate(sources)),
+                return_exceptions=True
+            )
+            
+            for source, products in zip(sources, results):
+                if isinstance(products, Exception):
+                    self._thread_safe_print(f"❌ Exception for {source}: {products}")
+                    products = []
+                products_by_source[source] = products
+                all_products.extend(products)
         else:
             for source in sources:
-                products = self._scrape_single_source(source, query, sort_by_price)
+                products = await asyncio.to_thread(self._scrape_single_source, source, query, sort_by_price)
                 products_by_source[source] = products
                 all_products.extend(products)
         
@@ -1511,7 +1715,11 @@ class PriceComparisonService:
         
         self.output.write(f"{'='*80}\n")
         
-        return all_products[:top_n]
+        result = all_products[:top_n]
+        # Empty results usually mean every scraper failed, so they are retried next time
+        if result:
+            self._cache_result(cache_key, result)
+        return result
 
 
 # ============================================================================
@@ -1774,6 +1982,11 @@ def root():
         }
     }
 
+@app.on_event("shutdown")
+def close_browsers():
+    """Quit the pooled scraper browsers"""
+    price_service.driver_pool.close()
+
 @app.get("/health")
 async def health():
     """Health check endpoint"""
@@ -1824,7 +2037,7 @@ def download_report(
 
 # Price Comparison Endpoints
 @app.get("/api/compare", response_model=List[ProductOut])
-def compare(
+async def compare(
     query: str = Query(..., description="Product search query"),
     sources: Optional[str] = Query(None, description="Comma-separated source names (alfatah,daraz,imtiaz)"),
     top_n: int = Query(10, ge=1, le=100, description="Number of products to return"),
@@ -1857,7 +2070,7 @@ def compare(
                 detail=f"Invalid sources: {', '.join(invalid)}. Available: {', '.join(available)}"
             )
     
-    products = price_service.find_products(
+    products = await price_service.find_products_async(
         query=query,
         sources=source_list,
         top_n=top_n,
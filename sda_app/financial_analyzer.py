@@ -1,8 +1,19 @@
 from decimal import Decimal
-from django.db.models import Sum, Avg, Count
-from datetime import date, timedelta
+from django.db.models import Sum, Avg, Count, Q
+from datetime import date
 from dateutil.relativedelta import relativedelta
-from collections import defaultdict
+from .models import EXPENSE_CATEGORIES, OtherExpenses, CategoryBudget, Recommendation
+
+
+# Categories checked for month-over-month spending spikes (in reporting order),
+# taken from the expense model's choices so the analyzer can't drift from them
+_CATEGORY_LABELS = dict(EXPENSE_CATEGORIES)
+TRACKED_CATEGORIES = tuple(_CATEGORY_LABELS)
+
+
+def _category_label(category):
+    """Display name used for a category in every user-facing message"""
+    return _CATEGORY_LABELS.get(category, category.capitalize())
 
 
 class FinancialAnalyzer:
@@ -10,25 +21,31 @@ class FinancialAnalyzer:
     
     def __init__(self, user):
         self.user = user
+        # Loaded once here (or reused if the caller fetched the user with
+        # select_related('account')); every method reads this same instance
         self.account = user.account
+        self._insights_cache = None
+        
+        # Month boundaries shared by every analysis method
+        self._month_start = date.today().replace(day=1)
+        self._three_months_ago = self._month_start - relativedelta(months=3)
     
-    def get_all_insights(self):
-        """Get all financial insights"""
-        from .models import OtherExpenses
+    def get_all_insights(self, refresh=False):
+        """Get all financial insights (computed once per analyzer unless refresh=True)"""
+        if self._insights_cache is not None and not refresh:
+            return self._insights_cache
         
         # Get expenses for current month
-        current_month = date.today().replace(day=1)
         expenses = OtherExpenses.objects.filter(
             user=self.user,
-            expense_date__gte=current_month
+            expense_date__gte=self._month_start
         )
         
-        total_expenses = expenses.aggregate(total=Sum('amount'))['total'] or Decimal('0')
-        
-        # Category breakdown
-        category_breakdown = expenses.values('category').annotate(
+        # Category breakdown (the month total is the sum of it, no separate aggregate needed)
+        category_breakdown = list(expenses.values('category').annotate(
             total=Sum('amount')
-        ).order_by('-total')
+        ).order_by('-total'))
+        total_expenses = sum((item['total'] for item in category_breakdown), Decimal('0'))
         
         insights = {
             'total_expenses': float(total_expenses),
@@ -48,6 +65,7 @@ class FinancialAnalyzer:
             'recommendations': self._generate_recommendations(total_expenses)
         }
         
+        self._insights_cache = insights
         return insights
     
     def _generate_recommendations(self, total_expenses):
@@ -88,98 +106,95 @@ class FinancialAnalyzer:
     
     def analyze_spending_mistakes(self):
         """Analyze spending mistakes based on actual user data"""
-        from .models import OtherExpenses, CategoryBudget
-        
         mistakes = []
-        current_month_start = date.today().replace(day=1)
-        last_month_start = (current_month_start - timedelta(days=1)).replace(day=1)
         
-        # Get current and previous month expenses
+        # Get current month expenses
         current_expenses = OtherExpenses.objects.filter(
             user=self.user,
-            expense_date__gte=current_month_start
+            expense_date__gte=self._month_start
         )
         
-        previous_expenses = OtherExpenses.objects.filter(
-            user=self.user,
-            expense_date__gte=last_month_start,
-            expense_date__lt=current_month_start
+        # 1. UNUSUAL SPENDING: Category spikes compared to past averages
+        # Current month totals per category (one grouped query)
+        current_totals = dict(
+            current_expenses.values('category').annotate(total=Sum('amount')).values_list('category', 'total')
         )
         
-        if not current_expenses.exists():
+        # No expenses this month (checked here rather than with a separate exists() query)
+        if not current_totals:
             return []
         
-        # 1. UNUSUAL SPENDING: Category spikes compared to past averages
-        for category in ['food', 'transportation', 'entertainment', 'utilities', 'healthcare', 'education', 'other']:
-            current_cat_total = current_expenses.filter(category=category).aggregate(
-                total=Sum('amount')
-            )['total'] or Decimal('0')
-            
-            # Calculate historical average (last 3 months excluding current)
-            three_months_ago = current_month_start - relativedelta(months=3)
-            historical_avg = OtherExpenses.objects.filter(
+        # Historical average per category (last 3 months excluding current, one grouped query)
+        historical_avgs = dict(
+            OtherExpenses.objects.filter(
                 user=self.user,
-                category=category,
-                expense_date__gte=three_months_ago,
-                expense_date__lt=current_month_start
-            ).aggregate(avg=Avg('amount'))['avg'] or Decimal('0')
+                category__in=TRACKED_CATEGORIES,
+                expense_date__gte=self._three_months_ago,
+                expense_date__lt=self._month_start
+            ).values('category').annotate(avg=Avg('amount')).values_list('category', 'avg')
+        )
+        
+        for category in TRACKED_CATEGORIES:
+            current_cat_total = current_totals.get(category) or Decimal('0')
+            historical_avg = historical_avgs.get(category) or Decimal('0')
             
             if historical_avg > 0 and current_cat_total > historical_avg * 2:
+                spent = float(current_cat_total)
                 mistakes.append({
                     'type': 'unusual_spending',
                     'severity': 'high',
-                    'description': f'{category.capitalize()} spending is {float(current_cat_total/historical_avg):.1f}x higher than your 3-month average of ${float(historical_avg):.2f}',
-                    'amount': float(current_cat_total),
+                    'description': f'{_category_label(category)} spending is {float(current_cat_total/historical_avg):.1f}x higher than your 3-month average of ${float(historical_avg):.2f}',
+                    'amount': spent,
                     'category': category
                 })
         
         # 2. OVERSPENDING: Exceeding budgets
         if self.account.budget_limit > 0 and self.account.total_expenses > self.account.budget_limit:
-            overspend_amount = self.account.total_expenses - self.account.budget_limit
+            overspend_amount = float(self.account.total_expenses - self.account.budget_limit)
             mistakes.append({
                 'type': 'overspending',
                 'severity': 'critical',
-                'description': f'Exceeded total budget by ${float(overspend_amount):.2f} (${float(self.account.total_expenses):.2f} spent of ${float(self.account.budget_limit):.2f} limit)',
-                'amount': float(overspend_amount),
+                'description': f'Exceeded total budget by ${overspend_amount:.2f} (${float(self.account.total_expenses):.2f} spent of ${float(self.account.budget_limit):.2f} limit)',
+                'amount': overspend_amount,
                 'category': 'total'
             })
         
-        # Check category budget overspending
-        category_budgets = CategoryBudget.objects.filter(user=self.user)
-        for cat_budget in category_budgets:
-            cat_spent = current_expenses.filter(category=cat_budget.category).aggregate(
-                total=Sum('amount')
-            )['total'] or Decimal('0')
+        # Check category budget overspending (spent amounts come from current_totals above)
+        category_budgets = CategoryBudget.objects.filter(user=self.user).values_list('category', 'limit')
+        for category, limit in category_budgets:
+            cat_spent = current_totals.get(category) or Decimal('0')
             
-            if cat_spent > cat_budget.limit:
-                overspend = cat_spent - cat_budget.limit
+            if cat_spent > limit:
+                overspend = cat_spent - limit
+                spent = float(cat_spent)
                 mistakes.append({
                     'type': 'overspending',
                     'severity': 'high',
-                    'description': f'{cat_budget.category.capitalize()} budget exceeded by ${float(overspend):.2f} (${float(cat_spent):.2f} spent of ${float(cat_budget.limit):.2f} limit)',
-                    'amount': float(cat_spent),
-                    'category': cat_budget.category
+                    'description': f'{_category_label(category)} budget exceeded by ${float(overspend):.2f} (${spent:.2f} spent of ${float(limit):.2f} limit)',
+                    'amount': spent,
+                    'category': category
                 })
         
         # 3. UNNECESSARY EXPENSES: Small repeated purchases that add up
-        small_expenses = current_expenses.filter(amount__lt=50).order_by('category', 'expense_date')
-        
-        # Group by category and count
-        category_counts = defaultdict(list)
-        for expense in small_expenses:
-            category_counts[expense.category].append(float(expense.amount))
-        
-        for category, amounts in category_counts.items():
-            if len(amounts) >= 5:  # 5 or more small transactions
-                total_small = sum(amounts)
-                if total_small > 100:  # Adds up to significant amount
-                    mistakes.append({
-                        'type': 'unnecessary_expenses',
-                        'severity': 'medium',
-                        'description': f'{len(amounts)} small {category} purchases totaling ${total_small:.2f} - consider consolidating or reducing',
-                        'amount': total_small,
-                        'category': category
-                    })
+        # Count and total small purchases per category in the database
+        small_stats = current_expenses.filter(amount__lt=50).values('category').annotate(
+            count=Count('id'),
+            total=Sum('amount')
+        ).filter(
+            count__gte=5,  # 5 or more small transactions
+            total__gt=100  # Adds up to significant amount
+        ).order_by('category')
+        
+        for stat in small_stats:
+            category = stat['category']
+            total_small = float(stat['total'])
+            mistakes.append({
+                'type': 'unnecessary_expenses',
+                'severity': 'medium',
+                'description': f"{stat['count']} small {_category_label(category)} purchases totaling ${total_small:.2f} - consider consolidating or reducing",
+                'amount': total_small,
+                'category': category
+            })
         
         return mistakes
     
@@ -192,39 +207,40 @@ class FinancialAnalyzer:
         
         for mistake in mistakes:
             if mistake['type'] == 'unusual_spending':
-                actions.append(f"Review your {mistake['category']} expenses and identify what caused the spike of ${mistake['amount']:.2f}")
+                actions.append(f"Review your {_category_label(mistake['category'])} expenses and identify what caused the spike of ${mistake['amount']:.2f}")
             
             elif mistake['type'] == 'overspending':
                 if mistake['category'] == 'total':
                     actions.append(f"Reduce spending by ${mistake['amount']:.2f} to stay within your overall budget")
                 else:
-                    actions.append(f"Cut back on {mistake['category']} expenses to get back under your ${mistake['amount']:.2f} budget")
+                    actions.append(f"Cut back on {_category_label(mistake['category'])} expenses to get back under your ${mistake['amount']:.2f} budget")
             
             elif mistake['type'] == 'unnecessary_expenses':
-                actions.append(f"Reduce frequency of small {mistake['category']} purchases - they added up to ${mistake['amount']:.2f} this month")
+                actions.append(f"Reduce frequency of small {_category_label(mistake['category'])} purchases - they added up to ${mistake['amount']:.2f} this month")
         
-        return list(set(actions))  # Remove duplicates
+        return list(dict.fromkeys(actions))  # Remove duplicates, keeping order
     
     def generate_saving_tips(self):
         """Generate personalized saving tips based on actual spending patterns"""
-        from .models import OtherExpenses
-        
         tips = []
-        current_month_start = date.today().replace(day=1)
         
         current_expenses = OtherExpenses.objects.filter(
             user=self.user,
-            expense_date__gte=current_month_start
+            expense_date__gte=self._month_start
         )
         
-        if not current_expenses.exists():
-            return []
-        
-        # Analyze category spending
-        category_totals = current_expenses.values('category').annotate(
+        # Analyze category spending (small purchases under $20 are counted in the same query)
+        small_purchase = Q(amount__lt=20)
+        category_totals = list(current_expenses.values('category').annotate(
             total=Sum('amount'),
-            count=Count('id')
-        ).order_by('-total')
+            count=Count('id'),
+            small_count=Count('id', filter=small_purchase),
+            small_total=Sum('amount', filter=small_purchase)
+        ).order_by('-total'))
+        
+        # No expenses this month (checked here rather than with a separate exists() query)
+        if not category_totals:
+            return []
         
         for cat_data in category_totals:
             category = cat_data['category']
@@ -251,11 +267,9 @@ class FinancialAnalyzer:
                     tips.append(f"Currently saving {current_savings_rate:.1f}% of income. Increase by ${potential_savings:.2f}/month to reach 20% savings goal")
         
         # High frequency, low-value purchases
-        small_frequent = current_expenses.filter(amount__lt=20).count()
+        small_frequent = sum(cat_data['small_count'] for cat_data in category_totals)
         if small_frequent > 10:
-            small_total = float(current_expenses.filter(amount__lt=20).aggregate(
-                total=Sum('amount')
-            )['total'] or Decimal('0'))
+            small_total = float(sum(cat_data['small_total'] or Decimal('0') for cat_data in category_totals))
             tips.append(f"{small_frequent} small purchases totaled ${small_total:.2f}. Reducing by half could save ${(small_total/2):.2f}")
         
         return tips
@@ -271,25 +285,23 @@ class FinancialAnalyzer:
         if self.account.monthly_income > 0 and self.account.total_expenses < self.account.monthly_income:
             score += 20
         
-        if not self.account.is_over_budget():
+        over_budget = self.account.is_over_budget()
+        if not over_budget:
             score += 15
         
         # Negative factors
         if self.account.current_balance < 0:
             score -= 30
         
-        if self.account.is_over_budget():
+        if over_budget:
             score -= 20
         
         return max(0, min(100, score))
     
     def save_recommendations_to_db(self):
         """Save recommendations to database"""
-        from .models import Recommendation
-        
         insights = self.get_all_insights()
-        for rec in insights['recommendations']:
-            Recommendation.objects.create(
-                user=self.user,
-                message=rec['message']
-            )
+        Recommendation.objects.bulk_create([
+            Recommendation(user=self.user, message=rec['message'])
+            for rec in insights['recommendations']
+        ], batch_size=100)
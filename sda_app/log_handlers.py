@@ -0,0 +1,16 @@
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+
+class BackgroundStreamHandler(QueueHandler):
+    """Log handler that queues records and writes them to stderr from a
+    background thread, so request threads never block on the output stream"""
+
+    def __init__(self):
+        super().__init__(queue.SimpleQueue())
+        # Records are already formatted by prepare() when they reach the listener
+        self.listener = QueueListener(self.queue, logging.StreamHandler())
+        self.listener.start()
+        atexit.register(self.listener.stop)
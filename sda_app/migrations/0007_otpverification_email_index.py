@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-16 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sda_app', '0006_alter_categorybudget_category_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='otpverification',
+            name='email',
+            field=models.EmailField(db_index=True, max_length=254),
+        ),
+    ]
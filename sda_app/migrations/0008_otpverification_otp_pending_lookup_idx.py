@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-16 14:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sda_app', '0007_otpverification_email_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='otpverification',
+            index=models.Index(condition=models.Q(('is_verified', False)), fields=['email', 'purpose', 'expires_at'], name='otp_pending_lookup_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-16 14:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sda_app', '0009_notification_notif_user_unread_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='otherexpenses',
+            index=models.Index(fields=['user', 'category', '-expense_date'], name='oe_user_cat_date_idx'),
+        ),
+    ]
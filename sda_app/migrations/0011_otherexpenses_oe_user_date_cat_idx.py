@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-16 14:28
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('sda_app', '0010_otherexpenses_oe_user_cat_date_idx'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='otherexpenses',
+            index=models.Index(fields=['user', 'expense_date', 'category'], include=('amount',), name='oe_user_date_cat_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-16 14:34
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('sda_app', '0011_otherexpenses_oe_user_date_cat_idx'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='otherexpenses',
+            index=models.Index(fields=['user', 'date_timestamp'], name='oe_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-16 14:37
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sda_app', '0012_otherexpenses_oe_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pricecache',
+            name='product_name_lc',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Lower('product_name'), output_field=models.CharField(max_length=255)),
+        ),
+        migrations.AddIndex(
+            model_name='pricecache',
+            index=models.Index(fields=['product_name_lc', 'source'], name='pricecache_lname_src_idx'),
+        ),
+    ]
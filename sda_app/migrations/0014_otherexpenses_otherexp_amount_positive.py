@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-16 14:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sda_app', '0013_pricecache_product_name_lc'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='otherexpenses',
+            constraint=models.CheckConstraint(condition=models.Q(('amount__gt', 0)), name='otherexp_amount_positive'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-16 14:41
+
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('sda_app', '0014_otherexpenses_otherexp_amount_positive'),
+    ]
+
+    operations = [
+        # Build the replacement first so price lookups stay indexed throughout
+        AddIndexConcurrently(
+            model_name='pricecache',
+            index=models.Index(fields=['product_name_lc', 'source', '-scraped_at'], name='pricecache_lname_src_at_idx'),
+        ),
+        RemoveIndexConcurrently(
+            model_name='pricecache',
+            name='pricecache_lname_src_idx',
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-16 15:05
+
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def lowercase_emails(apps, schema_editor):
+    """Lowercase stored emails to match the normalization done on save and in lookups"""
+    User = apps.get_model('sda_app', 'User')
+    OTPVerification = apps.get_model('sda_app', 'OTPVerification')
+
+    # Emails differing only in case would collide on the unique constraint;
+    # those accounts have to be merged or renamed by hand first
+    duplicates = list(
+        User.objects.values(email_lc=Lower('email'))
+        .annotate(n=Count('id'))
+        .filter(n__gt=1)
+        .values_list('email_lc', flat=True)
+    )
+    if duplicates:
+        raise RuntimeError(
+            "Cannot lowercase user emails, these addresses are used by more than one "
+            f"account when case is ignored: {', '.join(sorted(duplicates))}"
+        )
+
+    User.objects.exclude(email=Lower('email')).update(email=Lower('email'))
+    OTPVerification.objects.exclude(email=Lower('email')).update(email=Lower('email'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sda_app', '0015_pricecache_lname_src_at_idx'),
+    ]
+
+    operations = [
+        # Reversing leaves the lowercased emails in place (the original case is not kept)
+        migrations.RunPython(lowercase_emails, migrations.RunPython.noop),
+    ]
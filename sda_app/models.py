@@ -1,11 +1,16 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator
+from django.db.models.functions import Coalesce, Lower
 from decimal import Decimal
 from django.utils import timezone
 from datetime import timedelta
-import random
-import string
+import secrets
+
+
+def _as_decimal(amount):
+    """Return amount as a Decimal, converting via str() only when it isn't one already"""
+    return amount if isinstance(amount, Decimal) else Decimal(str(amount))
 
 
 class User(AbstractUser):
@@ -17,6 +22,12 @@ class User(AbstractUser):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
     
+    def save(self, *args, **kwargs):
+        # Store emails lowercase so exact lookups hit the unique index
+        if self.email:
+            self.email = self.email.lower()
+        super().save(*args, **kwargs)
+    
     def get_full_name(self):
         """Return the user's full name"""
         return f"{self.first_name} {self.last_name}".strip()
@@ -52,59 +63,76 @@ class Account(models.Model):
     
     def update_total_expenses(self):
         """Update total expenses from all user expenses"""
-        other_expenses = sum(expense.amount for expense in self.user.other_expenses.all())
-        self.total_expenses = other_expenses
-        self.save()
+        # Summed in the database rather than by loading every expense row
+        totals = OtherExpenses.objects.filter(user_id=self.user_id).aggregate(total=models.Sum('amount'))
+        self.total_expenses = totals['total'] or Decimal('0.00')
+        self.save(update_fields=['total_expenses'])
     
     def update_current_balance(self):
         """Update current balance by subtracting new expenses"""
         self.update_total_expenses()
     
+    # Balance changes are applied as single UPDATEs with F() expressions so concurrent
+    # requests can't overwrite each other; the instance is refreshed afterwards
     def add_salary(self):
         """Add monthly income to current balance"""
-        self.current_balance += self.monthly_income
-        self.save()
+        Account.objects.filter(pk=self.pk).update(
+            current_balance=models.F('current_balance') + models.F('monthly_income')
+        )
+        self.refresh_from_db(fields=['current_balance'])
     
     def subtract_expense(self, expense_amount):
         """Subtract expense amount from current balance"""
-        from decimal import Decimal
-        expense_amount = Decimal(str(expense_amount))
-        self.current_balance -= expense_amount
-        self.save()
+        expense_amount = _as_decimal(expense_amount)
+        Account.objects.filter(pk=self.pk).update(current_balance=models.F('current_balance') - expense_amount)
+        self.refresh_from_db(fields=['current_balance'])
     
     def add_to_savings(self, amount):
         """Add amount to savings and subtract from current balance"""
-        from decimal import Decimal
-        amount = Decimal(str(amount))
-        if amount <= self.current_balance:
-            self.savings += amount
-            self.current_balance -= amount
-            self.save()
-            return True
-        return False
+        amount = _as_decimal(amount)
+        # The balance check is part of the UPDATE, so the transfer either happens fully or not at all
+        updated = Account.objects.filter(pk=self.pk, current_balance__gte=amount).update(
+            savings=models.F('savings') + amount,
+            current_balance=models.F('current_balance') - amount
+        )
+        if updated:
+            self.refresh_from_db(fields=['savings', 'current_balance'])
+        return bool(updated)
     
     def withdraw_from_savings(self, amount):
         """Withdraw amount from savings and add to current balance"""
-        from decimal import Decimal
-        amount = Decimal(str(amount))
-        if amount <= self.savings:
-            self.savings -= amount
-            self.current_balance += amount
-            self.save()
-            return True
-        return False
+        amount = _as_decimal(amount)
+        updated = Account.objects.filter(pk=self.pk, savings__gte=amount).update(
+            savings=models.F('savings') - amount,
+            current_balance=models.F('current_balance') + amount
+        )
+        if updated:
+            self.refresh_from_db(fields=['savings', 'current_balance'])
+        return bool(updated)
     
     def add_money(self, amount):
         """Add money to current balance (used for refunds, adding money, etc.)"""
-        from decimal import Decimal
-        amount = Decimal(str(amount))
-        self.current_balance += amount
-        self.save()
+        amount = _as_decimal(amount)
+        Account.objects.filter(pk=self.pk).update(current_balance=models.F('current_balance') + amount)
+        self.refresh_from_db(fields=['current_balance'])
     
     def __str__(self):
         return f"{self.user.get_full_name() or self.user.username}'s Account"
 
 
+# Expense categories shared by expenses and category budgets
+EXPENSE_CATEGORIES = (
+    ('food', 'Food'),
+    ('transportation', 'Transportation'),
+    ('entertainment', 'Entertainment'),
+    ('utilities', 'Utilities'),
+    ('healthcare', 'Healthcare'),
+    ('education', 'Education'),
+    ('shopping', 'Shopping'),
+    ('other', 'Other'),
+)
+
+
 class Expense(models.Model):
     """Base expense model - Django abstract base class"""
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -131,16 +159,21 @@ class OtherExpenses(Expense):
     """Other expenses subclass of Expense"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='other_expenses')
     expense_date = models.DateField(default=timezone.now)
-    category = models.CharField(max_length=50, choices=[
-        ('food', 'Food'),
-        ('transportation', 'Transportation'),
-        ('entertainment', 'Entertainment'),
-        ('utilities', 'Utilities'),
-        ('healthcare', 'Healthcare'),
-        ('education', 'Education'),
-        ('shopping', 'Shopping'),
-        ('other', 'Other'),
-    ])
+    category = models.CharField(max_length=50, choices=EXPENSE_CATEGORIES)
+    
+    class Meta:
+        indexes = [
+            # Latest-first history per user and category (unusual spending check, category totals)
+            models.Index(fields=['user', 'category', '-expense_date'], name='oe_user_cat_date_idx'),
+            # Monthly aggregates by date range and category; INCLUDE lets Sum/Avg(amount) skip the heap (PostgreSQL)
+            models.Index(fields=['user', 'expense_date', 'category'], include=['amount'], name='oe_user_date_cat_idx'),
+            # Expense list ETag (count + latest date_timestamp per user) from the index alone
+            models.Index(fields=['user', 'date_timestamp'], name='oe_user_created_idx'),
+        ]
+        constraints = [
+            # Enforced by the database too, so bulk_create and update() can't store bad amounts
+            models.CheckConstraint(condition=models.Q(amount__gt=0), name='otherexp_amount_positive'),
+        ]
     
     def get_expense_type(self):
         """Return the type of expense"""
@@ -161,16 +194,7 @@ class OtherExpenses(Expense):
 class CategoryBudget(models.Model):
     """Category-wise budget limits"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='category_budgets')
-    category = models.CharField(max_length=50, choices=[
-        ('food', 'Food'),
-        ('transportation', 'Transportation'),
-        ('entertainment', 'Entertainment'),
-        ('utilities', 'Utilities'),
-        ('healthcare', 'Healthcare'),
-        ('education', 'Education'),
-        ('shopping', 'Shopping'),
-        ('other', 'Other'),
-    ])
+    category = models.CharField(max_length=50, choices=EXPENSE_CATEGORIES)
     limit = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(Decimal('0.01'))])
     
     class Meta:
@@ -178,10 +202,29 @@ class CategoryBudget(models.Model):
         verbose_name = "Category Budget"
         verbose_name_plural = "Category Budgets"
     
+    @classmethod
+    def with_spent(cls, user):
+        """Budgets for a user with the amount spent per category annotated in the same query"""
+        spent = OtherExpenses.objects.filter(
+            user_id=models.OuterRef('user_id'),
+            category=models.OuterRef('category')
+        ).values('category').annotate(total=models.Sum('amount')).values('total')
+        return cls.objects.filter(user=user).annotate(
+            spent=Coalesce(
+                models.Subquery(spent),
+                models.Value(Decimal('0.00')),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2)
+            )
+        )
+    
     def get_spent(self):
-        """Calculate total spent in this category"""
-        expenses = OtherExpenses.objects.filter(user=self.user, category=self.category)
-        return sum(expense.amount for expense in expenses)
+        """Calculate total spent in this category (uses the with_spent() annotation when present)"""
+        if not hasattr(self, 'spent'):
+            totals = OtherExpenses.objects.filter(user_id=self.user_id, category=self.category).aggregate(
+                total=models.Sum('amount')
+            )
+            self.spent = totals['total'] or Decimal('0.00')
+        return self.spent
     
     def get_remaining(self):
         """Calculate remaining budget for this category"""
@@ -215,7 +258,7 @@ class MonthlySummary(models.Model):
     def calculate_savings(self):
         """Calculate savings achieved for the month"""
         self.savings_achieved = self.total_income - self.total_expenses
-        self.save()
+        self.save(update_fields=['savings_achieved'])
         return self.savings_achieved
     
     def __str__(self):
@@ -232,26 +275,40 @@ class Recommendation(models.Model):
         return f"Recommendation for {self.user.get_full_name() or self.user.username}"
 
 
+ALERT_TYPES = (
+    ('budget_exceeded', 'Budget Exceeded'),
+    ('unusual_expense', 'Unusual Expense'),
+    ('savings_goal', 'Savings Goal'),
+    ('monthly_summary', 'Monthly Summary'),
+)
+
+
 class Alert(models.Model):
     """Alert model for notifications"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='alerts')
     message = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
     read = models.BooleanField(default=False)
-    alert_type = models.CharField(max_length=50, choices=[
-        ('budget_exceeded', 'Budget Exceeded'),
-        ('unusual_expense', 'Unusual Expense'),
-        ('savings_goal', 'Savings Goal'),
-        ('monthly_summary', 'Monthly Summary'),
-    ], default='budget_exceeded')
+    alert_type = models.CharField(max_length=50, choices=ALERT_TYPES, default='budget_exceeded')
     
     def __str__(self):
         return f"Alert for {self.user.get_full_name() or self.user.username}: {self.message}"
 
 
+# Scraped prices older than this are considered stale
+PRICE_CACHE_TTL = timedelta(hours=24)
+
+
 class PriceCache(models.Model):
     """Cache for scraped product prices to reduce scraping time"""
     product_name = models.CharField(max_length=255, db_index=True)
+    # Lowercased copy maintained by the database (also covers bulk_create), so name
+    # lookups are plain equality matches on an index instead of case-insensitive scans
+    product_name_lc = models.GeneratedField(
+        expression=Lower('product_name'),
+        output_field=models.CharField(max_length=255),
+        db_persist=True,
+    )
     source = models.CharField(max_length=50)  # alfatah, daraz, imtiaz
     price_pkr = models.DecimalField(max_digits=10, decimal_places=2)
     price_usd = models.DecimalField(max_digits=10, decimal_places=2)
@@ -264,48 +321,56 @@ class PriceCache(models.Model):
         indexes = [
             models.Index(fields=['product_name', 'source']),
             models.Index(fields=['scraped_at']),
+            # Serves get_cached_price: equality on name + source, newest first (no sort for LIMIT 1)
+            models.Index(fields=['product_name_lc', 'source', '-scraped_at'], name='pricecache_lname_src_at_idx'),
         ]
     
     def is_stale(self):
         """Check if cache is older than 24 hours"""
-        return timezone.now() - self.scraped_at > timedelta(hours=24)
+        return timezone.now() - self.scraped_at > PRICE_CACHE_TTL
     
     @classmethod
     def get_cached_price(cls, product_name, source):
         """Get cached price if not stale"""
-        try:
-            cache = cls.objects.filter(
-                product_name__iexact=product_name,
-                source=source
-            ).latest('scraped_at')
-            
-            if not cache.is_stale():
-                return cache
-        except cls.DoesNotExist:
-            pass
-        return None
+        # Staleness is filtered in the query, so a miss is just an empty result (None)
+        cutoff = timezone.now() - PRICE_CACHE_TTL
+        return cls.objects.filter(
+            product_name_lc=product_name.lower(),
+            source=source,
+            scraped_at__gte=cutoff
+        ).order_by('-scraped_at').first()
     
     @classmethod
-    def clean_old_cache(cls):
+    def clean_old_cache(cls, batch_size=1000):
         """Delete cache entries older than 24 hours"""
-        cutoff_time = timezone.now() - timedelta(hours=24)
-        cls.objects.filter(scraped_at__lt=cutoff_time).delete()
+        cutoff_time = timezone.now() - PRICE_CACHE_TTL
+        stale = cls.objects.filter(scraped_at__lt=cutoff_time)
+        deleted = 0
+        # Delete in bounded batches so a large cleanup never holds locks on the whole table
+        while True:
+            ids = list(stale.values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            deleted += cls.objects.filter(pk__in=ids).delete()[0]
     
     def __str__(self):
         return f"{self.product_name} - {self.source} (${self.price_usd})"
 
 
+NOTIFICATION_TYPES = (
+    ('unusual_spending', 'Unusual Spending'),
+    ('budget_alert', 'Budget Alert'),
+    ('savings_goal', 'Savings Goal'),
+    ('general', 'General'),
+)
+
+
 class Notification(models.Model):
     """In-app notifications for users"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
     title = models.CharField(max_length=200)
     message = models.TextField()
-    notification_type = models.CharField(max_length=50, choices=[
-        ('unusual_spending', 'Unusual Spending'),
-        ('budget_alert', 'Budget Alert'),
-        ('savings_goal', 'Savings Goal'),
-        ('general', 'General'),
-    ])
+    notification_type = models.CharField(max_length=50, choices=NOTIFICATION_TYPES)
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
@@ -313,11 +378,15 @@ class Notification(models.Model):
         ordering = ['-created_at']
         verbose_name = "Notification"
         verbose_name_plural = "Notifications"
+        indexes = [
+            # Covers the unread count, mark-all-read and latest-first listing per user
+            models.Index(fields=['user', 'is_read', '-created_at'], name='notif_user_unread_idx'),
+        ]
     
     def mark_as_read(self):
         """Mark notification as read"""
         self.is_read = True
-        self.save()
+        self.save(update_fields=['is_read'])
     
     @classmethod
     def create_unusual_spending_alert(cls, user, expense, reason):
@@ -343,63 +412,100 @@ class Notification(models.Model):
         return f"{self.user.username} - {self.title}"
 
 
+# How long a newly issued OTP stays valid
+OTP_TTL = timedelta(minutes=10)
+
+OTP_PURPOSES = (
+    ('signup', 'Signup'),
+    ('password_reset', 'Password Reset'),
+    ('email_change', 'Email Change'),
+)
+
+
 class OTPVerification(models.Model):
     """OTP verification model for email verification during signup and password reset"""
-    email = models.EmailField()
+    email = models.EmailField(db_index=True)
     otp_code = models.CharField(max_length=6)
     created_at = models.DateTimeField(auto_now_add=True)
     expires_at = models.DateTimeField()
     is_verified = models.BooleanField(default=False)
     attempts = models.IntegerField(default=0)
-    purpose = models.CharField(max_length=20, default='signup', choices=[
-        ('signup', 'Signup'),
-        ('password_reset', 'Password Reset'),
-        ('email_change', 'Email Change'),
-    ])
+    purpose = models.CharField(max_length=20, default='signup', choices=OTP_PURPOSES)
     
     class Meta:
         verbose_name = "OTP Verification"
         verbose_name_plural = "OTP Verifications"
+        indexes = [
+            # Verify endpoints only ever look up pending, unexpired codes
+            models.Index(
+                fields=['email', 'purpose', 'expires_at'],
+                condition=models.Q(is_verified=False),
+                name='otp_pending_lookup_idx',
+            ),
+        ]
     
     def save(self, *args, **kwargs):
+        if self.email:
+            self.email = self.email.lower()
         if not self.pk:  # Only set expiry time when creating new OTP
-            self.expires_at = timezone.now() + timedelta(minutes=10)  # OTP expires in 10 minutes
+            self.expires_at = timezone.now() + OTP_TTL
         super().save(*args, **kwargs)
     
     @classmethod
     def generate_otp(cls):
         """Generate a 6-digit OTP"""
-        return ''.join(random.choices(string.digits, k=6))
+        # secrets rather than random: OTPs must not be predictable
+        return f"{secrets.randbelow(1_000_000):06d}"
     
     @classmethod
-    def create_otp(cls, email):
-        """Create a new OTP for the given email"""
-        # Delete any existing unverified OTPs for this email
-        cls.objects.filter(email=email, is_verified=False).delete()
-        
-        # Generate new OTP
-        otp_code = cls.generate_otp()
-        otp = cls.objects.create(email=email, otp_code=otp_code)
+    def create_otp(cls, email, purpose='signup'):
+        """Create a new OTP for the given email and purpose"""
+        email = email.lower()
+        # Replace any pending OTPs for this email and purpose in one transaction
+        with transaction.atomic():
+            cls.objects.filter(email=email, purpose=purpose, is_verified=False).delete()
+            otp = cls.objects.create(email=email, otp_code=cls.generate_otp(), purpose=purpose)
         return otp
     
+    @classmethod
+    def prune_expired(cls):
+        """Delete all expired OTPs in a single query (for periodic cleanup)"""
+        return cls.objects.filter(expires_at__lt=timezone.now()).delete()
+    
     def is_valid(self):
         """Check if OTP is still valid (not expired and not verified)"""
         return not self.is_verified and timezone.now() <= self.expires_at
     
+    @classmethod
+    def consume(cls, email, purpose, input_otp):
+        """Use up a pending OTP, returning False if it is wrong, expired or already used"""
+        # Check and mark verified in one UPDATE so two concurrent requests can't both succeed
+        return cls.objects.filter(
+            email=email,
+            purpose=purpose,
+            otp_code=input_otp,
+            is_verified=False,
+            expires_at__gte=timezone.now()
+        ).update(is_verified=True) > 0
+    
     def verify(self, input_otp):
         """Verify the OTP code"""
-        self.attempts += 1
-        self.save()
+        otp = OTPVerification.objects.filter(pk=self.pk)
+        # Check and mark verified in one UPDATE so two concurrent attempts can't both succeed
+        verified = otp.filter(
+            is_verified=False,
+            expires_at__gte=timezone.now(),
+            otp_code=input_otp
+        ).update(is_verified=True, attempts=models.F('attempts') + 1)
+        if not verified:
+            otp.update(attempts=models.F('attempts') + 1)
+        self.refresh_from_db(fields=['is_verified', 'attempts', 'expires_at'])
         
+        if verified:
+            return True, "OTP verified successfully"
         if not self.is_valid():
             return False, "OTP has expired or already been used"
-        
-        if self.otp_code == input_otp:
-            self.is_verified = True
-            self.save()
-            return True, "OTP verified successfully"
-        else:
-            return False, "Invalid OTP code"
+        return False, "Invalid OTP code"
     
     def __str__(self):
         return f"OTP for {self.email} - {'Verified' if self.is_verified else 'Pending'}"
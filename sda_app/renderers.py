@@ -0,0 +1,49 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+# Non-str dict keys (e.g. the int item indexes in ListField/DictField errors)
+# become strings as with json.dumps; aware UTC datetimes get DRF's 'Z' suffix
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+
+# Types orjson doesn't handle itself (Decimal, lazy strings, querysets...)
+# are converted exactly as DRF's encoder would
+_drf_default = JSONEncoder().default
+
+
+def dumps(data):
+    """Encode data as compact UTF-8 JSON the way the API renders responses"""
+    return orjson.dumps(data, default=_drf_default, option=ORJSON_OPTIONS)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSON renderer backed by orjson, encoding API responses in C
+
+    The output is equivalent JSON to DRF's JSONRenderer but not always
+    byte-identical (floats may be spelled differently, e.g. 1e16 vs 1e+16).
+    One behavioural difference: NaN and +/-Infinity are written as null,
+    where DRF's strict renderer raises ValueError. Anything orjson refuses
+    to encode (ints beyond 64 bits, unusual dict keys) is rendered by DRF's
+    JSONRenderer instead.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        # orjson only pretty-prints with a fixed indent, so indented output
+        # (browsable API, ?indent=) keeps using the stdlib encoder
+        if self.get_indent(accepted_media_type, renderer_context) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = dumps(data)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same \u2028/\u2029 escaping as DRF, so the output stays a strict JavaScript subset
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
@@ -757,35 +757,29 @@ class ShoppingCartService:
                         sl.created_at,
                         sl.updated_at,
                         COUNT(sli.id) as item_count,
-                        COUNT(CASE WHEN sli.status = 'purchased' THEN 1 END) as purchased_count
+                        COUNT(CASE WHEN sli.status = 'purchased' THEN 1 END) as purchased_count,
+                        COALESCE(SUM(pr.price_usd * sli.quantity), 0) as total_price_usd
                     FROM shopping_lists sl
                     LEFT JOIN shopping_list_items sli ON sl.id = sli.list_id
+                    -- Each item has at most one rank-1 recommendation, so this join doesn't change the counts
+                    LEFT JOIN price_recommendations pr ON sli.id = pr.list_item_id AND pr.rank = 1
                     WHERE sl.user_id = %s
                     GROUP BY sl.id, sl.name, sl.created_at, sl.updated_at
                     ORDER BY sl.updated_at DESC
                 """, (user_id,))
                 lists = cur.fetchall()
-                result = []
-                for l in lists:
-                    # Calculate total price in USD for the list
-                    cur.execute("""
-                        SELECT SUM(pr.price_usd * sli.quantity) AS total_price_usd
-                        FROM shopping_list_items sli
-                        LEFT JOIN price_recommendations pr ON sli.id = pr.list_item_id AND pr.rank = 1
-                        WHERE sli.list_id = %s
-                    """, (l['id'],))
-                    price_row = cur.fetchone()
-                    total_price_usd = price_row['total_price_usd'] if price_row and price_row['total_price_usd'] is not None else 0.0
-                    result.append({
+                return [
+                    {
                         'id': l['id'],
                         'name': l['name'],
                         'created_at': l['created_at'].isoformat(),
                         'updated_at': l['updated_at'].isoformat(),
                         'item_count': l['item_count'],
                         'purchased_count': l['purchased_count'],
-                        'total_price_usd': float(total_price_usd)
-                    })
-                return result
+                        'total_price_usd': float(l['total_price_usd'])
+                    }
+                    for l in lists
+                ]
     
     def add_items_to_list(self, list_id: int, user_id: int, items: List[Dict]):
         """Add items to an existing shopping list"""
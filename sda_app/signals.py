@@ -0,0 +1,87 @@
+from decimal import Decimal
+from functools import partial
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from .models import OtherExpenses
+
+# Running per-category expense totals, stored in cents so cache.incr() stays integer.
+# Only kept when the cache is shared by all workers (CACHE_IS_SHARED); otherwise the
+# totals are summed from the database (covered by oe_user_cat_date_idx). Writes that
+# skip model signals (QuerySet.update(), bulk_create()) are picked up on expiry.
+CATEGORY_TOTAL_TIMEOUT = 15 * 60  # seconds
+
+
+def category_total_key(user_id, category):
+    return f"cat_sum:{user_id}:{category}"
+
+
+def _to_cents(amount):
+    return int(Decimal(str(amount)) * 100)
+
+
+def _running_totals_enabled():
+    return getattr(settings, 'CACHE_IS_SHARED', False)
+
+
+def get_category_total(user_id, category):
+    """Get total spent by a user in a category, backfilling the cache on a miss"""
+    key = category_total_key(user_id, category)
+    cents = cache.get(key) if _running_totals_enabled() else None
+    if cents is None:
+        total = OtherExpenses.objects.filter(
+            user_id=user_id,
+            category=category
+        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+        cents = _to_cents(total)
+        # add() rather than set(), so a total another request has already
+        # stored and adjusted is never overwritten with this older sum
+        if _running_totals_enabled():
+            cache.add(key, cents, CATEGORY_TOTAL_TIMEOUT)
+    return Decimal(cents) / 100
+
+
+def _adjust_category_total(key, cents):
+    try:
+        cache.incr(key, cents)
+    except ValueError:
+        # Not cached yet; the next read backfills from the database
+        pass
+
+
+@receiver(post_init, sender=OtherExpenses)
+def remember_category_total_key(sender, instance, **kwargs):
+    """Note which total a loaded expense counts towards, for when it is updated"""
+    # Read from __dict__ so deferred fields are not fetched
+    fields = instance.__dict__
+    if fields.get('id') is not None and fields.get('user_id') is not None and 'category' in fields:
+        instance._loaded_total_key = category_total_key(fields['user_id'], fields['category'])
+
+
+@receiver(post_save, sender=OtherExpenses)
+def update_category_total_on_save(sender, instance, created, **kwargs):
+    """Add new expenses to the cached total; drop it when an existing expense changes"""
+    if not _running_totals_enabled():
+        return
+    key = category_total_key(instance.user_id, instance.category)
+    # Adjust only once the expense is committed, so rolled back writes never count
+    if created:
+        transaction.on_commit(partial(_adjust_category_total, key, _to_cents(instance.amount)))
+    else:
+        # Amount, category or owner may have changed - drop the totals the expense
+        # was counted in before and after, and let the next reads recompute them
+        keys = {key, getattr(instance, '_loaded_total_key', key)}
+        transaction.on_commit(partial(cache.delete_many, keys))
+    instance._loaded_total_key = key
+
+
+@receiver(post_delete, sender=OtherExpenses)
+def update_category_total_on_delete(sender, instance, **kwargs):
+    """Subtract deleted expenses from the cached total"""
+    if not _running_totals_enabled():
+        return
+    key = category_total_key(instance.user_id, instance.category)
+    transaction.on_commit(partial(_adjust_category_total, key, -_to_cents(instance.amount)))
@@ -1,3 +1,398 @@
-from django.test import TestCase
+import importlib
+import json
+import math
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.core.cache import cache
+from django.db import DatabaseError, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+
+from .api_views import (
+    OTP_MAX_ATTEMPTS, _issue_otp, _otp_attempts_exceeded, _reset_otp_attempts, check_budget_overspending,
+)
+from .models import Account, Notification, OTPVerification, OtherExpenses, User
+from .renderers import ORJSONRenderer
+from .signals import category_total_key, get_category_total
+
+
+# Tests must not depend on (or pollute) a shared Redis cache
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def make_user(email='user@example.com', username='user', balance=Decimal('1000.00'), savings=Decimal('0.00')):
+    user = User.objects.create_user(
+        email=email, username=username, password='pw-12345!', first_name='Test', last_name='User'
+    )
+    Account.objects.create(user=user, current_balance=balance, savings=savings)
+    return user
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class OTPAttemptLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_blocks_after_max_attempts(self):
+        for _ in range(OTP_MAX_ATTEMPTS):
+            self.assertFalse(_otp_attempts_exceeded('a@example.com', 'signup'))
+        self.assertTrue(_otp_attempts_exceeded('a@example.com', 'signup'))
+
+    def test_counted_per_email_and_purpose(self):
+        for _ in range(OTP_MAX_ATTEMPTS + 1):
+            _otp_attempts_exceeded('a@example.com', 'signup')
+        self.assertFalse(_otp_attempts_exceeded('b@example.com', 'signup'))
+        self.assertFalse(_otp_attempts_exceeded('a@example.com', 'password_reset'))
+
+    def test_reset_clears_the_counter(self):
+        for _ in range(OTP_MAX_ATTEMPTS + 1):
+            _otp_attempts_exceeded('a@example.com', 'signup')
+        _reset_otp_attempts('a@example.com', 'signup')
+        self.assertFalse(_otp_attempts_exceeded('a@example.com', 'signup'))
+
+
+class IssueOTPTests(TestCase):
+    def test_new_code_replaces_pending_code(self):
+        first = _issue_otp('a@example.com', 'signup')
+        second = _issue_otp('a@example.com', 'signup')
+
+        pending = OTPVerification.objects.get(email='a@example.com', purpose='signup')
+        self.assertEqual(pending.otp_code, second)
+        self.assertFalse(pending.is_verified)
+        self.assertEqual(len(first), 6)
+
+    def test_other_purposes_are_kept(self):
+        _issue_otp('a@example.com', 'signup')
+        _issue_otp('a@example.com', 'password_reset')
+        self.assertEqual(OTPVerification.objects.filter(email='a@example.com', is_verified=False).count(), 2)
+
+
+class EmailNormalizationTests(TestCase):
+    def test_emails_are_stored_lowercase(self):
+        user = make_user(email='User@Example.com')
+        otp = OTPVerification.objects.create(email='User@Example.com', otp_code='123456')
+        self.assertEqual(user.email, 'user@example.com')
+        self.assertEqual(otp.email, 'user@example.com')
+
+    def test_login_with_mixed_case_email(self):
+        make_user(email='user@example.com')
+        response = self.client.post(
+            reverse('api_login'), {'email': 'USER@example.com', 'password': 'pw-12345!'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_migration_lowercases_existing_emails(self):
+        migration = importlib.import_module('sda_app.migrations.0016_lowercase_emails')
+        user = make_user()
+        User.objects.filter(pk=user.pk).update(email='User@Example.com')
+
+        migration.lowercase_emails(apps, None)
+        self.assertEqual(User.objects.get(pk=user.pk).email, 'user@example.com')
+
+    def test_migration_refuses_case_insensitive_duplicates(self):
+        migration = importlib.import_module('sda_app.migrations.0016_lowercase_emails')
+        make_user()
+        other = make_user(email='other@example.com', username='other')
+        User.objects.filter(pk=other.pk).update(email='User@Example.com')
+
+        with self.assertRaisesMessage(RuntimeError, 'user@example.com'):
+            migration.lowercase_emails(apps, None)
+
+
+class AccountSavingsTests(TestCase):
+    def setUp(self):
+        self.account = make_user(balance=Decimal('100.00'), savings=Decimal('50.00')).account
+
+    def assertBalances(self, current_balance, savings):
+        stored = Account.objects.get(pk=self.account.pk)
+        self.assertEqual((stored.current_balance, stored.savings), (Decimal(current_balance), Decimal(savings)))
+        self.assertEqual((self.account.current_balance, self.account.savings), (Decimal(current_balance), Decimal(savings)))
+
+    def test_add_to_savings(self):
+        self.assertTrue(self.account.add_to_savings('40.25'))
+        self.assertBalances('59.75', '90.25')
+
+    def test_add_to_savings_with_insufficient_balance(self):
+        self.assertFalse(self.account.add_to_savings('100.01'))
+        self.assertBalances('100.00', '50.00')
+
+    def test_withdraw_from_savings(self):
+        self.assertTrue(self.account.withdraw_from_savings(50))
+        self.assertBalances('150.00', '0.00')
+
+    def test_withdraw_more_than_saved(self):
+        self.assertFalse(self.account.withdraw_from_savings('50.01'))
+        self.assertBalances('100.00', '50.00')
+
+    def test_check_uses_the_stored_balance(self):
+        # Another request spent the money after this instance was loaded
+        Account.objects.filter(pk=self.account.pk).update(current_balance=Decimal('10.00'))
+        self.assertFalse(self.account.add_to_savings(20))
+        self.assertEqual(Account.objects.get(pk=self.account.pk).current_balance, Decimal('10.00'))
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ExpensesETagTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.client.force_login(self.user)
+        self.url = reverse('api_expenses')
+        OtherExpenses.objects.create(user=self.user, amount=Decimal('12.50'), category='food')
+
+    def test_unchanged_list_returns_304(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_new_expense_changes_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        OtherExpenses.objects.create(user=self.user, amount=Decimal('1.00'), category='other')
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()), 2)
+
+    def test_etag_is_per_user(self):
+        etag = self.client.get(self.url)['ETag']
+        other = make_user('other@example.com', 'other')
+        OtherExpenses.objects.create(user=other, amount=Decimal('12.50'), category='food')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class BudgetAlertTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user()
+        Account.objects.filter(user=self.user).update(budget_limit=Decimal('100.00'), total_expenses=Decimal('150.00'))
+        self.user.refresh_from_db()
+        self.expense = OtherExpenses.objects.create(user=self.user, amount=Decimal('150.00'), category='food')
+
+    def budget_alerts(self):
+        return Notification.objects.filter(user=self.user, notification_type='budget_alert').count()
+
+    def test_alert_is_sent_once(self):
+        check_budget_overspending(self.user, self.expense)
+        check_budget_overspending(self.user, self.expense)
+        self.assertEqual(self.budget_alerts(), 1)
+
+    def test_failed_insert_does_not_suppress_the_alert(self):
+        with mock.patch.object(Notification.objects, 'bulk_create', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                check_budget_overspending(self.user, self.expense)
+        self.assertEqual(self.budget_alerts(), 0)
+
+        check_budget_overspending(self.user, self.expense)
+        self.assertEqual(self.budget_alerts(), 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHE, CACHE_IS_SHARED=True)
+class CategoryTotalSignalTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user()
+
+    def add_expense(self, amount, category='food', user=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return OtherExpenses.objects.create(user=user or self.user, amount=Decimal(amount), category=category)
+
+    def save(self, expense):
+        with self.captureOnCommitCallbacks(execute=True):
+            expense.save()
+
+    def test_backfills_from_database(self):
+        self.add_expense('10.25')
+        self.assertEqual(get_category_total(self.user.id, 'food'), Decimal('10.25'))
+        self.assertEqual(cache.get(category_total_key(self.user.id, 'food')), 1025)
+
+    def test_backfill_keeps_a_total_stored_meanwhile(self):
+        self.add_expense('10.25')
+        # Another request stored (and adjusted) the total while this one summed
+        with mock.patch.object(cache, 'get', return_value=None):
+            cache.add(category_total_key(self.user.id, 'food'), 1535)
+            get_category_total(self.user.id, 'food')
+        self.assertEqual(cache.get(category_total_key(self.user.id, 'food')), 1535)
+
+    def test_create_and_delete_adjust_cached_total(self):
+        self.add_expense('10.25')
+        get_category_total(self.user.id, 'food')
+
+        expense = self.add_expense('5.10')
+        self.assertEqual(cache.get(category_total_key(self.user.id, 'food')), 1535)
+        self.assertEqual(get_category_total(self.user.id, 'food'), Decimal('15.35'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            expense.delete()
+        self.assertEqual(get_category_total(self.user.id, 'food'), Decimal('10.25'))
+
+    def test_rolled_back_expense_is_not_counted(self):
+        get_category_total(self.user.id, 'food')
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    OtherExpenses.objects.create(user=self.user, amount=Decimal('5.00'), category='food')
+                    raise DatabaseError
+            except DatabaseError:
+                pass
+        self.assertEqual(get_category_total(self.user.id, 'food'), Decimal('0'))
+
+    def test_uncached_total_is_not_created_by_signals(self):
+        self.add_expense('10.00')
+        self.assertIsNone(cache.get(category_total_key(self.user.id, 'food')))
+
+    def test_update_invalidates_old_and_new_totals(self):
+        expense = self.add_expense('10.00')
+        other_user = make_user('other@example.com', 'other')
+        self.assertEqual(get_category_total(self.user.id, 'food'), Decimal('10.00'))
+        self.assertEqual(get_category_total(self.user.id, 'shopping'), Decimal('0'))
+
+        expense.amount = Decimal('3.00')
+        expense.category = 'shopping'
+        self.save(expense)
+        self.assertEqual(get_category_total(self.user.id, 'food'), Decimal('0'))
+        self.assertEqual(get_category_total(self.user.id, 'shopping'), Decimal('3.00'))
+
+        expense = OtherExpenses.objects.get(pk=expense.pk)
+        expense.user = other_user
+        self.save(expense)
+        self.assertEqual(get_category_total(self.user.id, 'shopping'), Decimal('0'))
+        self.assertEqual(get_category_total(other_user.id, 'shopping'), Decimal('3.00'))
+
+    def test_update_does_not_query_the_old_row(self):
+        expense = OtherExpenses.objects.get(pk=self.add_expense('10.00').pk)
+        expense.category = 'shopping'
+        with self.assertNumQueries(1):
+            self.save(expense)
+
+    @override_settings(CACHE_IS_SHARED=False)
+    def test_per_process_cache_sums_from_database(self):
+        self.add_expense('10.00')
+        self.assertEqual(get_category_total(self.user.id, 'food'), Decimal('10.00'))
+        self.add_expense('2.50')
+        self.assertEqual(get_category_total(self.user.id, 'food'), Decimal('12.50'))
+        self.assertIsNone(cache.get(category_total_key(self.user.id, 'food')))
+
+
+class OTPVerificationTests(TestCase):
+    def setUp(self):
+        self.otp = OTPVerification.objects.create(email='user@example.com', otp_code='123456', purpose='signup')
+
+    def test_correct_code_verifies_once(self):
+        self.assertEqual(self.otp.verify('123456'), (True, "OTP verified successfully"))
+        self.assertTrue(self.otp.is_verified)
+
+        # A second attempt with the same code (e.g. a replayed request) must fail
+        other = OTPVerification.objects.get(pk=self.otp.pk)
+        self.assertEqual(other.verify('123456'), (False, "OTP has expired or already been used"))
+        self.assertEqual(OTPVerification.objects.get(pk=self.otp.pk).attempts, 2)
+
+    def test_stale_instance_cannot_reuse_code(self):
+        # Both instances were loaded before either verified; only one may succeed
+        stale = OTPVerification.objects.get(pk=self.otp.pk)
+        self.assertTrue(self.otp.verify('123456')[0])
+        self.assertFalse(stale.verify('123456')[0])
+
+    def test_wrong_code_counts_an_attempt(self):
+        self.assertEqual(self.otp.verify('000000'), (False, "Invalid OTP code"))
+        self.assertFalse(self.otp.is_verified)
+        self.assertEqual(self.otp.attempts, 1)
+
+    def test_expired_code_is_rejected(self):
+        OTPVerification.objects.filter(pk=self.otp.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.otp.verify('123456'), (False, "OTP has expired or already been used"))
+        self.assertFalse(OTPVerification.objects.get(pk=self.otp.pk).is_verified)
+
+    def test_consume_succeeds_once(self):
+        self.assertFalse(OTPVerification.consume('user@example.com', 'password_reset', '123456'))
+        self.assertTrue(OTPVerification.consume('user@example.com', 'signup', '123456'))
+        self.assertFalse(OTPVerification.consume('user@example.com', 'signup', '123456'))
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+@mock.patch('sda_app.api_views.OTPService')
+class OTPEndpointTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def post(self, name, data):
+        return self.client.post(reverse(name), data, content_type='application/json')
+
+    def test_signup_code_cannot_be_replayed(self, otp_service):
+        User.objects.create_user(
+            email='new@example.com', username='new', password='pw-12345!', first_name='New', last_name='User', is_active=False
+        )
+        otp = _issue_otp('new@example.com', 'signup')
+
+        self.assertEqual(self.post('api_verify_otp', {'email': 'new@example.com', 'otp': otp}).status_code, 200)
+        self.assertEqual(self.post('api_verify_otp', {'email': 'new@example.com', 'otp': otp}).status_code, 400)
+        self.assertEqual(Account.objects.filter(user__email='new@example.com').count(), 1)
+
+    def test_failed_signup_keeps_the_code(self, otp_service):
+        # No user to activate: the account setup fails and the code stays usable
+        otp = _issue_otp('ghost@example.com', 'signup')
+        self.assertEqual(self.post('api_verify_otp', {'email': 'ghost@example.com', 'otp': otp}).status_code, 400)
+        self.assertFalse(OTPVerification.objects.get(email='ghost@example.com').is_verified)
+
+    def test_password_reset_code_is_used_when_the_password_is_set(self, otp_service):
+        make_user()
+        otp = _issue_otp('user@example.com', 'password_reset')
+        data = {'email': 'user@example.com', 'otp': otp, 'new_password': 'new-pw-12345!'}
+
+        self.assertEqual(self.post('api_verify_password_reset_otp', data).status_code, 200)
+        self.assertEqual(self.post('api_set_new_password', data).status_code, 200)
+        self.assertEqual(self.post('api_set_new_password', data).status_code, 400)
+        self.assertTrue(User.objects.get(email='user@example.com').check_password('new-pw-12345!'))
+
+
+class ORJSONRendererTests(TestCase):
+    def render_both(self, data, media_type=None):
+        return JSONRenderer().render(data, media_type), ORJSONRenderer().render(data, media_type)
+
+    def test_matches_drf_for_api_types(self):
+        data = {
+            'amount': Decimal('12.50'),
+            'created_at': timezone.now(),
+            'date': timezone.now().date(),
+            'label': gettext_lazy('Food'),
+            'items': [1, 2.5, None, True, 'ünïcode'],
+        }
+        drf, fast = self.render_both(data)
+        self.assertEqual(fast, drf)
+        self.assertTrue(json.loads(fast)['created_at'].endswith('Z'))
+
+    def test_non_str_keys(self):
+        # DRF keys ListField/DictField item errors by index
+        drf, fast = self.render_both({'xs': {0: ['bad'], 2: ['worse']}})
+        self.assertEqual(fast, drf)
+
+    def test_ints_beyond_64_bits_fall_back_to_drf(self):
+        drf, fast = self.render_both({'n': 2 ** 70})
+        self.assertEqual(fast, drf)
+
+    def test_escapes_line_separators(self):
+        drf, fast = self.render_both({'s': 'a\u2028b\u2029c'})
+        self.assertEqual(fast, drf)
+        self.assertIn(b'\\u2028', fast)
+
+    def test_indent_uses_drf_encoder(self):
+        drf, fast = self.render_both({'a': 1}, 'application/json; indent=2')
+        self.assertEqual(fast, drf)
+
+    def test_nan_is_written_as_null(self):
+        # Documented difference: DRF's strict renderer raises instead
+        self.assertEqual(ORJSONRenderer().render({'x': math.nan}), b'{"x":null}')
+
+    def test_none_renders_empty_body(self):
+        self.assertEqual(ORJSONRenderer().render(None), b'')